@@ -14,6 +14,11 @@
 
 from os.path import join, dirname
 from connection_manager import ConnectionManager
+from utils import _to_bool
+from statistics import QueryStatistics
+from isolation import TestIsolationListener
+from listener import LibraryListener
+from cache import QueryCache
 from keywords import *
 
 execfile(join(dirname(__file__), 'version.py'))
@@ -66,3 +71,74 @@ class Pydblibrary(ConnectionManager, _ExistenceKeywords, _ExecutionKeywords,
 
     ROBOT_LIBRARY_SCOPE = 'GLOBAL'
     ROBOT_LIBRARY_VERSION = VERSION
+
+    def __init__(self, connectionPooling=False, poolMaxIdleTime=300,
+                 poolHealthCheck=True, batchSize=1000,
+                 statementCacheSize=0, sampleRowsNumber=10,
+                 queryStatistics=False, queryStatisticsReport=None,
+                 testIsolation=False, queryCacheSize=0, queryCacheTtl=60,
+                 concurrentConnections=4, poolMaxSize=10):
+        """
+        Library can be imported with optional arguments.
+
+        *Arguments:*
+            - connectionPooling: bool, if True - `Disconnect From Database` \
+            keeps connection open in the pool and `Connect To Database` with \
+            the same driver and params reuses it.
+            - poolMaxIdleTime: int, seconds after which idle pooled \
+            connection is closed.
+            - poolHealthCheck: bool, if True - pooled connection is checked \
+            with simple query before it is reused.
+            - batchSize: int, default number of rows fetched at once by \
+            keywords that process results in batches.
+            - statementCacheSize: int, number of parameterized statements \
+            kept prepared per connection for drivers that support it, \
+            0 disables preparing. Prepared statements do not work through \
+            poolers that share server sessions between transactions, e.g. \
+            pgbouncer in transaction pooling mode.
+            - sampleRowsNumber: int, maximal number of result rows shown in \
+            log and failure messages.
+            - queryStatistics: bool, if True - time, fetched rows and bytes \
+            of every sql statement are recorded per keyword and per \
+            connection alias, see `Get Query Statistics`.
+            - queryStatisticsReport: string, path of file the slow-query \
+            report is written to at the end of the run, query statistics \
+            are collected if it is specified.
+            - testIsolation: bool, if True - every test is run in \
+            `Begin Test Isolation` on all open databases and databases \
+            connected during test, its changes are rolled back when test \
+            ends.
+            - queryCacheSize: int, maximal number of rows of results kept \
+            by `Query` in cache, 0 disables cache. Results are cached per \
+            connection, they are dropped when connection executes any \
+            other statement than select or is closed, see \
+            `Get Query Cache Statistics`.
+            - queryCacheTtl: int, seconds after which cached result expires.
+            - concurrentConnections: int, maximal number of connections to \
+            one database used by `Run Queries Concurrently` and \
+            `Run Keywords Concurrently`.
+            - poolMaxSize: int, maximal number of idle connections kept in \
+            the pool, connections disconnected when pool is full are closed.
+
+        *Examples:*
+        | Library | Pydblibrary | connectionPooling=True | poolMaxIdleTime=60 |
+        | Library | Pydblibrary | connectionPooling=True | poolMaxSize=2 |
+        | Library | Pydblibrary | queryStatisticsReport=${OUTPUT DIR}/sql.txt |
+        | Library | Pydblibrary | queryCacheSize=10000 | queryCacheTtl=300 |
+        """
+
+        ConnectionManager.__init__(self, connectionPooling, poolMaxIdleTime,
+                                   poolHealthCheck, statementCacheSize,
+                                   poolMaxSize)
+        self._batchSize = int(batchSize)
+        self._sampleRowsNumber = int(sampleRowsNumber)
+        self._concurrentConnections = int(concurrentConnections)
+        if int(queryCacheSize):
+            self._queryCache = QueryCache(queryCacheSize, queryCacheTtl)
+        listeners = [LibraryListener(self)]
+        if _to_bool(queryStatistics) or queryStatisticsReport:
+            self._queryStatistics = QueryStatistics(queryStatisticsReport)
+            listeners.append(self._queryStatistics)
+        if _to_bool(testIsolation):
+            listeners.append(TestIsolationListener(self))
+        self.ROBOT_LIBRARY_LISTENER = listeners
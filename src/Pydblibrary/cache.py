@@ -0,0 +1,164 @@
+#    Copyright (c) 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Quoted literals and identifiers are kept as is by normalization.
+_QUOTED_PATTERN = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+
+def _normalize(sqlStatement):
+    """
+    Collapses whitespace outside quoted text and removes trailing semicolon,
+    so the same query written differently gets the same cache key.
+    """
+
+    parts = _QUOTED_PATTERN.split(sqlStatement.strip().rstrip(';'))
+    for i in range(0, len(parts), 2):
+        parts[i] = ' '.join(parts[i].split())
+
+    return ''.join(parts).strip()
+
+
+class QueryCache(object):
+    """
+    Cache of query results with expiration time and least recently used
+    eviction. Size of cache is measured in rows.
+    """
+
+    def __init__(self, maxRows, ttl=60):
+        self.maxRows = int(maxRows)
+        self.ttl = float(ttl)
+        self.hits = 0
+        self.misses = 0
+        self._rows = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(connection, selectStatement, parameters=None):
+        """
+        Builds cache key of query.
+
+        *Arguments:*
+            - connection: object, library connection query is performed on.
+            - selectStatement: string, sql select statement.
+            - parameters: list, bind parameters of statement.
+
+        *Return:*
+            - tuple, key or None if query could not be cached.
+        """
+
+        # Extra connections used for concurrent queries share results with
+        # their owner.
+        key = (connection.owner, _normalize(selectStatement),
+               None if parameters is None else tuple(parameters))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+
+        return key
+
+    def get(self, key):
+        """
+        Gets cached result of query.
+
+        *Arguments:*
+            - key: tuple, cache key.
+
+        *Return:*
+            - list of rows or None if result is not cached or expired.
+        """
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] < time.time():
+                self._rows -= len(entry[1])
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, rows):
+        """
+        Caches result of query, least recently used results are evicted
+        when cache is full. Results bigger than cache are not cached.
+
+        *Arguments:*
+            - key: tuple, cache key.
+            - rows: list, rows of result.
+
+        *Return:*
+            - None
+        """
+
+        if len(rows) > self.maxRows:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._rows -= len(previous[1])
+            while self._entries and self._rows + len(rows) > self.maxRows:
+                self._rows -= len(self._entries.popitem(last=False)[1][1])
+
+            self._entries[key] = (time.time() + self.ttl, list(rows))
+            self._rows += len(rows)
+
+    def invalidate(self, connection):
+        """
+        Removes cached results of all queries performed on connection.
+
+        *Arguments:*
+            - connection: object, library connection.
+
+        *Return:*
+            - None
+        """
+
+        with self._lock:
+            for key in [key for key in self._entries
+                        if key[0] is connection.owner]:
+                self._rows -= len(self._entries.pop(key)[1])
+
+    def clear(self):
+        """
+        Removes all cached results and resets counters.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+            self.hits = 0
+            self.misses = 0
+
+    def statistics(self):
+        """
+        Gets hits and misses counters and size of cache.
+
+        *Return:*
+            - dict with hits, misses, entries and rows keys.
+        """
+
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries), 'rows': self._rows}
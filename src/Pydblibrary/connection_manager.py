@@ -12,8 +12,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
 from robot.utils import ConnectionCache
 from robot.api import logger
+from dialects import get_dialect
+from utils import _to_bool
+
+# Names of prepared statements are unique within the process.
+_statementNames = count(1)
 
 
 class _Connection(object):
@@ -21,16 +30,311 @@ class _Connection(object):
     Connection class that could handle driver connection and driver name
     """
 
-    def __init__(self, driverName, dbConnection):
+    def __init__(self, driverName, dbConnection, pool=None, poolKey=None,
+                 statementCacheSize=0):
         self.driverName = driverName
         self.connection = dbConnection
+        self.dialect = get_dialect(driverName)
+        self.alias = None
+        # True between Begin Transaction and Commit/Rollback Transaction
+        # and while test isolation is active.
+        self.transactionBlock = False
+        # True while changes are rolled back at the end of test.
+        self.isolated = False
+        # True if transaction block is opened inside test isolation.
+        self.savepoint = False
+        self.closed = False
+        # Schema metadata cached by keywords, cleared when schema changes.
+        self.metadata = {}
+        # Driver module and its connect arguments.
+        self.connectArgs = None
+        # Connection whose extra connection this is, used for concurrent
+        # queries.
+        self.owner = self
+        self.workers = []
+        self._pool = pool
+        self._poolKey = poolKey
+        self._cursor = None
+        self._statementCacheSize = int(statementCacheSize)
+        self._statements = OrderedDict()
+
+    def cursor(self):
+        """
+        Gets cursor for the next statement.
+        One cursor is reused while dialect allows it, otherwise previous
+        cursor is closed before new one is created.
+        """
+
+        if self._cursor is not None:
+            if self.dialect.reusableCursor:
+                return self._cursor
+            self.close_cursor()
+
+        self._cursor = self.connection.cursor()
+        return self._cursor
+
+    def close_cursor(self):
+        """
+        Closes cursor of connection if it was created.
+        """
+
+        if self._cursor is not None:
+            try:
+                self._cursor.close()
+            finally:
+                self._cursor = None
+
+    def in_transaction(self):
+        """
+        Checks whether connection has open transaction.
+        """
+
+        return self.dialect.in_transaction(self.connection)
+
+    def prepared_statement(self, sqlStatement, parametersNumber):
+        """
+        Gets statement that executes prepared version of sql statement.
+        Statement is prepared on the first use and kept in the LRU cache,
+        the least recently used statement is deallocated when cache is full.
+        Statement that fails to be prepared is remembered and executed as
+        is.
+
+        *Arguments:*
+            - sqlStatement: string, sql statement with driver placeholders.
+            - parametersNumber: int, number of bind parameters.
+
+        *Return:*
+            - Executing sql statement or None if statement could not be \
+            prepared.
+        """
+
+        if not self._statementCacheSize or not self.dialect.supportsPrepare:
+            return None
+
+        if sqlStatement in self._statements:
+            name = self._statements.pop(sqlStatement)
+        else:
+            name = self._prepare(sqlStatement)
+            if len(self._statements) >= self._statementCacheSize:
+                evictedName = self._statements.popitem(last=False)[1]
+                if evictedName is not None:
+                    self.cursor().execute(
+                        self.dialect.deallocate(evictedName))
+
+        self._statements[sqlStatement] = name
+        if name is None:
+            return None
+
+        return self.dialect.execute_prepared(name, parametersNumber)
+
+    def _prepare(self, sqlStatement):
+        """
+        Prepares sql statement on the server side.
+
+        *Arguments:*
+            - sqlStatement: string, sql statement with driver placeholders.
+
+        *Return:*
+            - string, name of prepared statement or None if statement could \
+            not be prepared.
+        """
+
+        name = 'pydb_stmt_%d' % next(_statementNames)
+        prepareStatement = self.dialect.prepare(name, sqlStatement)
+        if prepareStatement is None:
+            return None
+
+        # Failed statement aborts open transaction, savepoint keeps it.
+        inTransaction = self.in_transaction()
+        cur = self.cursor()
+        try:
+            logger.debug("Preparing: %s" % prepareStatement)
+            if inTransaction:
+                cur.execute('SAVEPOINT pydb_prepare')
+            cur.execute(prepareStatement)
+            if inTransaction:
+                cur.execute('RELEASE SAVEPOINT pydb_prepare')
+        except Exception as e:
+            logger.debug("Statement could not be prepared, it is executed "
+                         "as is: %s" % e)
+            if inTransaction:
+                cur.execute('ROLLBACK TO SAVEPOINT pydb_prepare')
+            else:
+                self.connection.rollback()
+            return None
+
+        return name
 
     def close(self):
         """
         Close database connection.
+        Pooled connection is returned to the pool instead.
+        """
+
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+        self.close_cursor()
+        self._statements.clear()
+        self.metadata.clear()
+        self.transactionBlock = False
+        self.isolated = False
+        self.savepoint = False
+        self.closed = True
+        if self._pool is not None:
+            self._pool.release(self._poolKey, self.connection, self.dialect)
+        else:
+            self.connection.close()
+
+
+class _ConnectionPool(object):
+    """
+    Pool of idle driver connections keyed by driver and connection params.
+    """
+
+    def __init__(self, maxIdleTime=300, healthCheck=True, maxSize=10):
+        self.maxIdleTime = float(maxIdleTime)
+        self.healthCheck = healthCheck
+        self.maxSize = int(maxSize)
+        self._idle = {}
+
+    def acquire(self, key, dialect):
+        """
+        Takes warm connection from the pool.
+
+        *Arguments:*
+            - key: tuple, pool key.
+            - dialect: object, dialect of the driver.
+
+        *Return:*
+            - Driver connection or None if there is no usable idle connection.
         """
 
-        self.connection.close()
+        self._evict_expired()
+
+        idle = self._idle.get(key, [])
+        while idle:
+            dbConnection, releasedAt = idle.pop()
+            if not self.healthCheck or self._ping(dbConnection, dialect):
+                return dbConnection
+
+        return None
+
+    def release(self, key, dbConnection, dialect):
+        """
+        Resets session state of connection and puts it to the pool.
+        Connection is closed if pool already keeps maxSize idle connections.
+
+        *Arguments:*
+            - key: tuple, pool key.
+            - dbConnection: object, driver connection.
+            - dialect: object, dialect of the driver.
+
+        *Return:*
+            - None
+        """
+
+        try:
+            dialect.reset_session(dbConnection)
+        except Exception as e:
+            logger.debug("Session reset failed, connection is closed: %s" % e)
+            self._close(dbConnection)
+            return
+
+        self._evict_expired()
+        if sum(len(idle) for idle in self._idle.values()) >= self.maxSize:
+            logger.debug("Connection pool is full, connection is closed.")
+            self._close(dbConnection)
+            return
+
+        self._idle.setdefault(key, []).append((dbConnection, time.time()))
+        self._evict_expired()
+
+    def drain(self):
+        """
+        Closes all idle connections.
+
+        *Return:*
+            - int, number of closed connections.
+        """
+
+        closed = 0
+        for idle in self._idle.values():
+            for dbConnection, releasedAt in idle:
+                self._close(dbConnection)
+                closed += 1
+        self._idle = {}
+
+        return closed
+
+    def _evict_expired(self):
+        """
+        Closes connections that were idle longer than maxIdleTime.
+        """
+
+        deadline = time.time() - self.maxIdleTime
+        for key, idle in self._idle.items():
+            alive = []
+            for dbConnection, releasedAt in idle:
+                if releasedAt < deadline:
+                    self._close(dbConnection)
+                else:
+                    alive.append((dbConnection, releasedAt))
+            if alive:
+                self._idle[key] = alive
+            else:
+                del self._idle[key]
+
+    @staticmethod
+    def _ping(dbConnection, dialect):
+        """
+        Checks that connection is still usable.
+        """
+
+        try:
+            cur = dbConnection.cursor()
+            cur.execute(dialect.pingStatement)
+            cur.fetchall()
+            cur.close()
+            dbConnection.rollback()
+            return True
+        except Exception as e:
+            logger.debug("Health check of pooled connection failed: %s" % e)
+            _ConnectionPool._close(dbConnection)
+            return False
+
+    @staticmethod
+    def _close(dbConnection):
+        try:
+            dbConnection.close()
+        except Exception as e:
+            logger.debug("Failed to close pooled connection: %s" % e)
+
+
+class _ConnectionCache(ConnectionCache):
+    """
+    Connection cache whose current connection could be replaced in a
+    thread, so keywords run by the thread use its own connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._local = threading.local()
+        ConnectionCache.__init__(self, *args, **kwargs)
+
+    @property
+    def current(self):
+        return getattr(self._local, 'current', None) or self._current
+
+    @current.setter
+    def current(self, connection):
+        self._current = connection
+
+    def use_in_thread(self, connection):
+        """
+        Sets current connection of the calling thread, None resets it.
+        """
+
+        self._local.current = connection
 
 
 class ConnectionManager(object):
@@ -38,14 +342,28 @@ class ConnectionManager(object):
     Class that handles connection/disconnection to databases.
     """
 
-    def __init__(self):
-        self._connectionCache = ConnectionCache()
+    def __init__(self, connectionPooling=False, poolMaxIdleTime=300,
+                 poolHealthCheck=True, statementCacheSize=0, poolMaxSize=10):
+        self._connectionCache = _ConnectionCache()
+        # True while test isolation listener runs test, connections opened
+        # by the test are isolated right away.
+        self._isolateConnections = False
+        self._statementCacheSize = int(statementCacheSize)
+        self._connectionPool = None
+        if _to_bool(connectionPooling):
+            self._connectionPool = _ConnectionPool(poolMaxIdleTime,
+                                                   _to_bool(poolHealthCheck),
+                                                   poolMaxSize)
 
     def connect_to_database(self, driverName=None, dbName=None, username=None,
                             password=None, host='localhost',
-                            port="5432", alias=None):
+                            port="5432", alias=None, **extraParams):
         """
         Connects to database.
+        Arguments are mapped to connect arguments of 'psycopg2', \
+        'MySQLdb', 'pymysql', 'sqlite3', 'cx_Oracle' and 'pyodbc' drivers, \
+        other drivers get them as 'database', 'user', 'password', 'host' \
+        and 'port' arguments.
 
         *Arguments:*
             - driverName: string, name of python database driver.
@@ -55,6 +373,8 @@ class ConnectionManager(object):
             - host: string, database host.
             - port: int, database port.
             - alias: string, database alias for future use.
+            - extraParams: named arguments that are passed to driver \
+            connect function as is.
 
         *Return:*
             - None
@@ -62,35 +382,97 @@ class ConnectionManager(object):
         *Examples:*
         | Connect To Database | psycopg2 | PyDB | username | password \
         | localhost | 5432 | SomeCompanyDB |
+        | Connect To Database | sqlite3 | ${CURDIR}/test.db |
+        | Connect To Database | pyodbc | PyDB | username | password \
+        | localhost | 1433 | DRIVER={ODBC Driver 17 for SQL Server} |
         """
 
-        if isinstance(driverName, str):
+        if isinstance(driverName, basestring):
+            driverName = str(driverName)
             dbModule = __import__(driverName)
         else:
             dbModule = driverName
             driverName = 'Mock DB Driver'
 
-        connParams = {'database': dbName, 'user': username,
-                      'password': password, 'host': host, 'port': port}
-        if driverName in ("MySQLdb", "pymysql"):
-            connParams = {'db': dbName, 'user': username, 'passwd': password,
-                          'host': host, 'port': port}
-        elif driverName in ("psycopg2"):
-            connParams = {'database': dbName, 'user': username,
-                          'password': password, 'host': host, 'port': port}
+        dialect = get_dialect(driverName)
+        connParams = dialect.connection_params(dbName, username, password,
+                                               host, port)
+        connParams.update(extraParams)
 
         connStr = ['%s: %s' % (k, str(connParams[k])) for k in connParams]
         logger.debug('Connect using: %s' % ', '.join(connStr))
 
-        dbConnection = _Connection(driverName, dbModule.connect(**connParams))
+        dbConnection = self._open_connection(driverName, dbModule, connParams)
 
-        self._connectionCache.register(dbConnection, alias)
+        index = self._connectionCache.register(dbConnection, alias)
+        dbConnection.alias = alias or index
+        if self._isolateConnections:
+            self._begin_isolation(dbConnection)
         logger.info("Established connection to the %s database. "
                     "Alias %s. Driver name: %s." % (dbName, alias, driverName))
 
+    def _open_connection(self, driverName, dbModule, connParams):
+        """
+        Opens connection or takes it from the pool.
+
+        *Arguments:*
+            - driverName: string, name of python database driver.
+            - dbModule: object, driver module.
+            - connParams: dict, driver connect arguments.
+
+        *Return:*
+            - Connection object.
+        """
+
+        dialect = get_dialect(driverName)
+        poolKey = None
+        connection = None
+        if self._connectionPool is not None:
+            poolKey = (dbModule, tuple(sorted(connParams.items())))
+            connection = self._connectionPool.acquire(poolKey, dialect)
+            if connection is not None:
+                logger.debug('Reusing connection from the pool.')
+        if connection is None:
+            connection = dbModule.connect(**connParams)
+
+        dbConnection = _Connection(driverName, connection,
+                                   self._connectionPool, poolKey,
+                                   self._statementCacheSize)
+        dbConnection.connectArgs = (dbModule, connParams)
+
+        return dbConnection
+
+    def _worker_connections(self, connection, number):
+        """
+        Gets connections to the same database for concurrent queries.
+        The connection itself is the first of them, others are opened on
+        the first use and kept until the connection is closed.
+
+        *Arguments:*
+            - connection: object, connection.
+            - number: int, number of connections.
+
+        *Return:*
+            - list of connection objects.
+        """
+
+        while len(connection.workers) < number - 1:
+            worker = self._open_connection(connection.driverName,
+                                           *connection.connectArgs)
+            worker.alias = connection.alias
+            worker.owner = connection
+            # Schema changes made through any connection invalidate
+            # metadata of all of them.
+            worker.metadata = connection.metadata
+            connection.workers.append(worker)
+
+        return [connection] + connection.workers[:number - 1]
+
     def disconnect_from_database(self):
         """
         Disconnects from database.
+        If connection pooling is enabled, then connection is returned to the \
+        pool instead of being closed.
 
         *Arguments:*
             - None
@@ -103,7 +485,7 @@ class ConnectionManager(object):
         """
 
         if self._connectionCache.current:
-            self._connectionCache.current.close()
+            self._close_connection(self._connectionCache.current)
 
             curIndex = self._connectionCache.current_index
             aliasesCache = self._connectionCache._aliases
@@ -133,9 +515,20 @@ class ConnectionManager(object):
         | Disconnect From All Databases |
         """
 
-        self._connectionCache.close_all('close')
+        for connection in self._connectionCache:
+            if not connection.closed:
+                self._close_connection(connection)
+        self._connectionCache.empty_cache()
         logger.info("All databases were disconnected.")
 
+    def _close_connection(self, connection):
+        """
+        Closes connection and drops its cached query results.
+        """
+
+        self._invalidate_results(connection)
+        connection.close()
+
     def set_current_database(self, aliasOrIndex):
         """
         Sets current database by alias or index.
@@ -155,3 +548,39 @@ class ConnectionManager(object):
 
         self._connectionCache.switch(aliasOrIndex)
         logger.info("Connection switched to the %s database." % aliasOrIndex)
+
+    def _get_connection(self, aliasOrIndex=None):
+        """
+        Gets opened connection by alias or index without switching to it.
+
+        *Arguments:*
+            - aliasOrIndex: int or string, alias or index of opened \
+            database, current database if not specified.
+
+        *Return:*
+            - Connection object.
+        """
+
+        return self._connectionCache.get_connection(aliasOrIndex)
+
+    def drain_connection_pool(self):
+        """
+        Closes all idle connections kept in the connection pool.
+        Connections that are currently in use are not affected.
+
+        *Arguments:*
+            - None
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | Drain Connection Pool |
+        """
+
+        if self._connectionPool is None:
+            logger.info("Connection pooling is disabled.")
+            return
+
+        closed = self._connectionPool.drain()
+        logger.info("%s idle connection(s) were closed." % closed)
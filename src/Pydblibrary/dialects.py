@@ -0,0 +1,704 @@
+#    Copyright (c) 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import re
+from cStringIO import StringIO
+from itertools import count
+
+# Names of server side cursors are unique within the process.
+_cursorNames = count(1)
+
+
+class _GenericDialect(object):
+    """
+    Dialect that uses only SQL understood by any DB API 2.0 database.
+    """
+
+    supportsLimit = False
+    supportsPrepare = False
+    reusableCursor = True
+    # Several statements divided by semicolon are accepted by one execute.
+    multiStatements = False
+    # Backslash escapes quote characters inside string literals.
+    backslashEscapes = False
+    # TRUNCATE could be rolled back.
+    transactionalTruncate = False
+    # Failed statement makes transaction unusable until rollback.
+    failedStatementAbortsTransaction = False
+    # Streaming cursor is kept by commit of transaction it is opened in.
+    holdStreams = False
+    pingStatement = 'SELECT 1'
+    placeholder = '%s'
+
+    def connection_params(self, dbName, username, password, host, port):
+        """
+        Maps connection arguments of `Connect To Database` keyword to
+        keyword arguments of driver connect function.
+
+        *Arguments:*
+            - dbName: string, name of database.
+            - username: string, name of user.
+            - password: string, user password.
+            - host: string, database host.
+            - port: int, database port.
+
+        *Return:*
+            - dict of connect arguments.
+        """
+
+        return {'database': dbName, 'user': username, 'password': password,
+                'host': host, 'port': port}
+
+    def bind_placeholder(self, position):
+        """
+        Builds placeholder of bind parameter.
+
+        *Arguments:*
+            - position: int, position of parameter in statement starting \
+            from 1.
+
+        *Return:*
+            - string, placeholder.
+        """
+
+        return self.placeholder
+
+    def placeholders(self, parametersNumber):
+        """
+        Builds comma separated placeholders for bind parameters.
+
+        *Arguments:*
+            - parametersNumber: int, number of bind parameters.
+
+        *Return:*
+            - string, placeholders.
+        """
+
+        return ', '.join(self.bind_placeholder(position + 1)
+                         for position in range(parametersNumber))
+
+    def select_values(self, expressions):
+        """
+        Builds statement that selects one row of scalar expressions.
+
+        *Arguments:*
+            - expressions: list, sql expressions.
+
+        *Return:*
+            - Sql select statement.
+        """
+
+        return 'SELECT %s' % ', '.join(expressions)
+
+    def count(self, selectStatement):
+        """
+        Wraps select statement into the statement that counts its rows.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+
+        *Return:*
+            - Counting sql statement.
+        """
+
+        return 'SELECT COUNT(*) FROM (%s) pydb_count' % selectStatement
+
+    def modulo(self, expression, divisor):
+        """
+        Builds expression that gets remainder of division.
+
+        *Arguments:*
+            - expression: string, sql expression.
+            - divisor: int, divisor.
+
+        *Return:*
+            - Sql expression.
+        """
+
+        return 'MOD(%s, %d)' % (expression, divisor)
+
+    def checksum(self, columns, keyColumns):
+        """
+        Builds aggregate expression that computes checksum of rows on the
+        server side.
+
+        *Arguments:*
+            - columns: list, names of all columns of table.
+            - keyColumns: list, names of key columns that order rows.
+
+        *Return:*
+            - Sql expression or None if checksum should be computed on the \
+            client side.
+        """
+
+        return None
+
+    def truncate(self, tableNames, restartIdentity=False, cascade=False):
+        """
+        Builds statements that remove all rows from tables at once.
+
+        *Arguments:*
+            - tableNames: list, table names.
+            - restartIdentity: bool, if True - identity columns are reset.
+            - cascade: bool, if True - tables that reference specified \
+            tables are truncated too.
+
+        *Return:*
+            - List of sql statements or None if TRUNCATE is not supported.
+        """
+
+        return None
+
+    def table_names(self, dbCursor):
+        """
+        Gets names of all tables and views visible to connection.
+
+        *Arguments:*
+            - dbCursor: object, driver cursor.
+
+        *Return:*
+            - List of table names.
+        """
+
+        dbCursor.execute('SELECT table_name FROM information_schema.tables')
+
+        return [row[0] for row in dbCursor.fetchall()]
+
+    def primary_key_columns(self, dbCursor, tableName):
+        """
+        Gets primary key columns of the table in key order.
+
+        *Arguments:*
+            - dbCursor: object, driver cursor.
+            - tableName: string, table name.
+
+        *Return:*
+            - List of column names.
+        """
+
+        dbCursor.execute(
+            "SELECT ku.column_name "
+            "FROM information_schema.table_constraints tc "
+            "JOIN information_schema.key_column_usage ku "
+            "ON ku.constraint_schema = tc.constraint_schema "
+            "AND ku.constraint_name = tc.constraint_name "
+            "AND ku.table_name = tc.table_name "
+            "WHERE tc.constraint_type = 'PRIMARY KEY' "
+            "AND tc.table_name = '%s' "
+            "ORDER BY ku.ordinal_position" % _quote(tableName))
+
+        return [row[0] for row in dbCursor.fetchall()]
+
+    def isolation_level(self, dbCursor):
+        """
+        Gets transaction isolation level of connection.
+
+        *Arguments:*
+            - dbCursor: object, driver cursor.
+
+        *Return:*
+            - string, level name like 'READ COMMITTED' or None if it is \
+            unknown.
+        """
+
+        return None
+
+    def referenced_tables(self, dbCursor, tableName):
+        """
+        Gets tables referenced by foreign keys of the table.
+
+        *Arguments:*
+            - dbCursor: object, driver cursor.
+            - tableName: string, table name.
+
+        *Return:*
+            - List of table names.
+        """
+
+        dbCursor.execute(
+            "SELECT DISTINCT pk.table_name "
+            "FROM information_schema.table_constraints fk "
+            "JOIN information_schema.referential_constraints rc "
+            "ON rc.constraint_schema = fk.constraint_schema "
+            "AND rc.constraint_name = fk.constraint_name "
+            "JOIN information_schema.table_constraints pk "
+            "ON pk.constraint_schema = rc.unique_constraint_schema "
+            "AND pk.constraint_name = rc.unique_constraint_name "
+            "WHERE fk.constraint_type = 'FOREIGN KEY' "
+            "AND fk.table_name = '%s'" % _quote(tableName))
+
+        return [row[0] for row in dbCursor.fetchall()]
+
+    def prepare(self, name, sqlStatement):
+        """
+        Builds statement that prepares parameterized sql statement on the
+        server side. Prepared statements are used only by dialects with
+        supportsPrepare flag.
+
+        *Arguments:*
+            - name: string, name of prepared statement.
+            - sqlStatement: string, sql statement with driver placeholders.
+
+        *Return:*
+            - Preparing sql statement or None if statement could not be \
+            prepared.
+        """
+
+        return None
+
+    def execute_prepared(self, name, parametersNumber):
+        """
+        Builds statement that executes prepared statement.
+
+        *Arguments:*
+            - name: string, name of prepared statement.
+            - parametersNumber: int, number of bind parameters.
+
+        *Return:*
+            - Executing sql statement with driver placeholders.
+        """
+
+        if not parametersNumber:
+            return 'EXECUTE %s' % name
+        return 'EXECUTE %s (%s)' % (name, self.placeholders(parametersNumber))
+
+    def deallocate(self, name):
+        """
+        Builds statement that releases prepared statement.
+
+        *Arguments:*
+            - name: string, name of prepared statement.
+
+        *Return:*
+            - Sql statement.
+        """
+
+        return 'DEALLOCATE %s' % name
+
+    def insert_rows(self, dbCursor, tableName, columns, rows):
+        """
+        Inserts rows into table in one batch.
+
+        *Arguments:*
+            - dbCursor: object, driver cursor.
+            - tableName: string, table name.
+            - columns: list, names of inserted columns, all columns of \
+            table are used if empty.
+            - rows: list, rows of values.
+
+        *Return:*
+            - None
+        """
+
+        columnsClause = ' (%s)' % ', '.join(columns) if columns else ''
+        dbCursor.executemany('INSERT INTO %s%s VALUES (%s)' %
+                             (tableName, columnsClause,
+                              self.placeholders(len(rows[0]))), rows)
+
+    def streaming_cursor(self, dbConnection):
+        """
+        Creates cursor that is suitable for fetching rows in batches.
+
+        *Arguments:*
+            - dbConnection: object, driver connection.
+
+        *Return:*
+            - Database cursor object.
+        """
+
+        return dbConnection.cursor()
+
+    def in_transaction(self, dbConnection):
+        """
+        Checks whether connection has open transaction without a round trip
+        to the server.
+
+        *Arguments:*
+            - dbConnection: object, driver connection.
+
+        *Return:*
+            - bool, True if transaction is open or if it is unknown.
+        """
+
+        return getattr(dbConnection, 'in_transaction', True)
+
+    def begin(self, dbConnection):
+        """
+        Opens transaction that spans several statements. Drivers open it
+        implicitly with the first statement, so nothing is done by default.
+
+        *Arguments:*
+            - dbConnection: object, driver connection.
+
+        *Return:*
+            - None
+        """
+
+        pass
+
+    def reset_session(self, dbConnection):
+        """
+        Resets session state of connection before it is reused.
+
+        *Arguments:*
+            - dbConnection: object, driver connection.
+
+        *Return:*
+            - None
+        """
+
+        dbConnection.rollback()
+
+
+class _LimitDialect(_GenericDialect):
+    """
+    Dialect for databases that support LIMIT clause.
+    """
+
+    supportsLimit = True
+
+    def limit(self, selectStatement, rowsNumber, offset=0):
+        """
+        Limits select statement so it returns not more than rowsNumber rows.
+        Statement should not have its own limiting clause. Only dialects
+        with supportsLimit flag have this method.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+            - rowsNumber: int, maximal number of rows.
+            - offset: int, number of rows that are skipped.
+
+        *Return:*
+            - Limited sql statement.
+        """
+
+        if offset:
+            return '%s LIMIT %d OFFSET %d' % (selectStatement, rowsNumber,
+                                              offset)
+        return '%s LIMIT %d' % (selectStatement, rowsNumber)
+
+    def modulo(self, expression, divisor):
+        return '(%s) %% %d' % (expression, divisor)
+
+
+class _PostgresDialect(_LimitDialect):
+    """
+    Dialect for PostgreSQL databases.
+    """
+
+    supportsPrepare = True
+    multiStatements = True
+    transactionalTruncate = True
+    failedStatementAbortsTransaction = True
+    holdStreams = True
+
+    _placeholderPattern = re.compile(r'%(.)')
+
+    def truncate(self, tableNames, restartIdentity=False, cascade=False):
+        statement = 'TRUNCATE %s' % ', '.join(tableNames)
+        if restartIdentity:
+            statement += ' RESTART IDENTITY'
+        if cascade:
+            statement += ' CASCADE'
+
+        return [statement]
+
+    def isolation_level(self, dbCursor):
+        dbCursor.execute("SELECT current_setting('transaction_isolation')")
+
+        return dbCursor.fetchone()[0]
+
+    def checksum(self, columns, keyColumns):
+        return ("md5(string_agg(md5(CAST(ROW(%s) AS text)), '' ORDER BY %s))"
+                % (', '.join(columns), ', '.join(keyColumns)))
+
+    def prepare(self, name, sqlStatement):
+        positions = []
+
+        def replace(match):
+            if match.group(1) == '%':
+                return '%'
+            if match.group(1) != 's':
+                raise ValueError
+            positions.append(None)
+            return '$%d' % len(positions)
+
+        try:
+            statement = self._placeholderPattern.sub(replace, sqlStatement)
+        except ValueError:
+            # Named placeholders are not supported.
+            return None
+
+        return 'PREPARE %s AS %s' % (name, statement)
+
+    def insert_rows(self, dbCursor, tableName, columns, rows):
+        # executemany of psycopg2 sends rows one by one, COPY sends whole
+        # batch at once.
+        if not hasattr(dbCursor, 'copy_expert'):
+            return super(_PostgresDialect, self).insert_rows(
+                dbCursor, tableName, columns, rows)
+
+        data = StringIO()
+        for row in rows:
+            data.write(','.join(self._csv_value(value) for value in row))
+            data.write('\n')
+        data.seek(0)
+
+        columnsClause = ' (%s)' % ', '.join(columns) if columns else ''
+        dbCursor.copy_expert('COPY %s%s FROM STDIN WITH CSV' %
+                             (tableName, columnsClause), data)
+
+    @staticmethod
+    def _csv_value(value):
+        # Unquoted empty value is NULL in CSV format of COPY, so all other
+        # values except numbers are quoted.
+        if value is None:
+            return ''
+        if isinstance(value, float):
+            return repr(value)
+        if isinstance(value, (int, long)):
+            return str(value)
+        if isinstance(value, unicode):
+            value = value.encode('utf-8')
+
+        return '"%s"' % str(value).replace('"', '""')
+
+    def streaming_cursor(self, dbConnection):
+        # Named cursor keeps result on the server side and transfers only
+        # requested rows. Cursor declared WITH HOLD survives commit, but
+        # not rollback of transaction that declared it, so the transaction
+        # is committed right after the cursor is opened.
+        return dbConnection.cursor('pydb_stream_%d' % next(_cursorNames),
+                                   withhold=True)
+
+    def in_transaction(self, dbConnection):
+        # Status is tracked by libpq on the client side, 0 means idle.
+        return dbConnection.get_transaction_status() != 0
+
+    def reset_session(self, dbConnection):
+        # Rolls back transaction and runs RESET ALL on the server.
+        dbConnection.reset()
+        cur = dbConnection.cursor()
+        cur.execute('DEALLOCATE ALL')
+        cur.close()
+        dbConnection.commit()
+
+
+class _MysqlDialect(_LimitDialect):
+    """
+    Dialect for MySQL databases.
+    """
+
+    backslashEscapes = True
+
+    def connection_params(self, dbName, username, password, host, port):
+        return {'db': dbName, 'user': username, 'passwd': password,
+                'host': host, 'port': int(port)}
+
+    def isolation_level(self, dbCursor):
+        try:
+            dbCursor.execute('SELECT @@transaction_isolation')
+        except Exception:
+            # Variable has old name before MySQL 5.7.20.
+            dbCursor.execute('SELECT @@tx_isolation')
+
+        return dbCursor.fetchone()[0].replace('-', ' ')
+
+    def truncate(self, tableNames, restartIdentity=False, cascade=False):
+        # TRUNCATE always resets auto-increment counter and fails for
+        # referenced tables. Foreign key checks are not disabled, so rows
+        # of referencing tables are never orphaned, and DELETE that follows
+        # ON DELETE CASCADE rules is used for cascade.
+        if cascade:
+            return None
+
+        return ['TRUNCATE TABLE %s' % tableName for tableName in tableNames]
+
+    def referenced_tables(self, dbCursor, tableName):
+        dbCursor.execute("SELECT DISTINCT referenced_table_name "
+                         "FROM information_schema.referential_constraints "
+                         "WHERE constraint_schema = DATABASE() "
+                         "AND table_name = '%s'" % _quote(tableName))
+
+        return [row[0] for row in dbCursor.fetchall()]
+
+    def checksum(self, columns, keyColumns):
+        # Null flags distinguish NULL from empty string skipped by CONCAT_WS.
+        values = columns + ['ISNULL(%s)' % column for column in columns]
+        return "BIT_XOR(CRC32(CONCAT_WS('#', %s)))" % ', '.join(values)
+
+
+class _SqliteDialect(_LimitDialect):
+    """
+    Dialect for SQLite databases.
+    """
+
+    placeholder = '?'
+
+    def connection_params(self, dbName, username, password, host, port):
+        # Connection is used by threads of keywords that query databases
+        # at the same time, but never by two threads at once. Driver
+        # commits implicitly before SAVEPOINT and schema changes, so it
+        # runs in autocommit mode and transactions are opened explicitly.
+        return {'database': dbName, 'check_same_thread': False,
+                'isolation_level': None}
+
+    def begin(self, dbConnection):
+        # Connection opened with default isolation level begins
+        # transactions itself.
+        if dbConnection.isolation_level is None:
+            dbConnection.execute('BEGIN')
+
+    def primary_key_columns(self, dbCursor, tableName):
+        dbCursor.execute("PRAGMA table_info('%s')" % _quote(tableName))
+
+        return [row[1] for row in sorted(dbCursor.fetchall(),
+                                         key=lambda row: row[5])
+                if row[5]]
+
+    def isolation_level(self, dbCursor):
+        dbCursor.execute('PRAGMA read_uncommitted')
+        if dbCursor.fetchone()[0]:
+            return 'READ UNCOMMITTED'
+
+        return 'SERIALIZABLE'
+
+    def table_names(self, dbCursor):
+        dbCursor.execute("SELECT name FROM sqlite_master "
+                         "WHERE type IN ('table', 'view')")
+
+        return [row[0] for row in dbCursor.fetchall()]
+
+    def referenced_tables(self, dbCursor, tableName):
+        dbCursor.execute("PRAGMA foreign_key_list('%s')" % _quote(tableName))
+
+        return [row[2] for row in dbCursor.fetchall()]
+
+
+class _OracleDialect(_GenericDialect):
+    """
+    Dialect for Oracle databases.
+    """
+
+    supportsLimit = True
+    pingStatement = 'SELECT 1 FROM DUAL'
+
+    def connection_params(self, dbName, username, password, host, port):
+        return {'user': username, 'password': password,
+                'dsn': '%s:%s/%s' % (host, port, dbName)}
+
+    def bind_placeholder(self, position):
+        # Numeric style, every parameter has its own number.
+        return ':%d' % position
+
+    def select_values(self, expressions):
+        return 'SELECT %s FROM DUAL' % ', '.join(expressions)
+
+    def limit(self, selectStatement, rowsNumber, offset=0):
+        # Row limiting clause appeared in Oracle 12c.
+        return '%s OFFSET %d ROWS FETCH NEXT %d ROWS ONLY' % (
+            selectStatement, offset, rowsNumber)
+
+    def table_names(self, dbCursor):
+        dbCursor.execute('SELECT table_name FROM user_tables '
+                         'UNION ALL SELECT view_name FROM user_views')
+
+        return [row[0] for row in dbCursor.fetchall()]
+
+    def primary_key_columns(self, dbCursor, tableName):
+        dbCursor.execute("SELECT cc.column_name "
+                         "FROM user_constraints c "
+                         "JOIN user_cons_columns cc "
+                         "ON cc.constraint_name = c.constraint_name "
+                         "WHERE c.constraint_type = 'P' "
+                         "AND c.table_name = UPPER('%s') "
+                         "ORDER BY cc.position" % _quote(tableName))
+
+        return [row[0] for row in dbCursor.fetchall()]
+
+    def referenced_tables(self, dbCursor, tableName):
+        dbCursor.execute("SELECT DISTINCT pk.table_name "
+                         "FROM user_constraints fk "
+                         "JOIN user_constraints pk "
+                         "ON pk.constraint_name = fk.r_constraint_name "
+                         "WHERE fk.constraint_type = 'R' "
+                         "AND fk.table_name = UPPER('%s')" % _quote(tableName))
+
+        return [row[0] for row in dbCursor.fetchall()]
+
+    def reset_session(self, dbConnection):
+        dbConnection.rollback()
+
+
+class _OdbcDialect(_GenericDialect):
+    """
+    Dialect for databases connected through ODBC.
+    Driver or data source name is given in extra connection params.
+    """
+
+    placeholder = '?'
+
+    def connection_params(self, dbName, username, password, host, port):
+        # Keyword arguments are added to ODBC connection string.
+        return {'DATABASE': dbName, 'UID': username, 'PWD': password,
+                'SERVER': host, 'PORT': port}
+
+
+_DIALECTS = {
+    'psycopg2': _PostgresDialect(),
+    'MySQLdb': _MysqlDialect(),
+    'pymysql': _MysqlDialect(),
+    'sqlite3': _SqliteDialect(),
+    'cx_Oracle': _OracleDialect(),
+    'pyodbc': _OdbcDialect()
+}
+
+
+def _quote(value):
+    """
+    Escapes value for use inside quoted sql string literal.
+    """
+
+    return value.replace("'", "''")
+
+
+def register_dialect(driverName, dialect):
+    """
+    Registers dialect for the driver, so keywords use its sql syntax and
+    capabilities for connections made with this driver.
+
+    *Arguments:*
+        - driverName: string, name of python database driver.
+        - dialect: object, dialect, e.g. instance of subclass of \
+        _GenericDialect.
+
+    *Return:*
+        - None
+    """
+
+    _DIALECTS[driverName] = dialect
+
+
+def get_dialect(driverName):
+    """
+    Gets dialect for specified driver.
+
+    *Arguments:*
+        - driverName: string, name of python database driver.
+
+    *Return:*
+        - Dialect object, generic one if driver is unknown.
+    """
+
+    return _DIALECTS.get(driverName, _GenericDialect())
@@ -0,0 +1,38 @@
+#    Copyright (c) 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+class TestIsolationListener(object):
+    """
+    Library listener that isolates every test on all open connections,
+    connections opened during test, e.g. in test setup, are isolated when
+    they are opened. Changes made by test are rolled back when test ends.
+    """
+
+    ROBOT_LISTENER_API_VERSION = 2
+
+    def __init__(self, library):
+        self._library = library
+
+    def start_test(self, name, attrs):
+        self._library._isolateConnections = True
+        for connection in self._library._connectionCache:
+            if not connection.closed and not connection.isolated:
+                self._library._begin_isolation(connection)
+
+    def end_test(self, name, attrs):
+        self._library._isolateConnections = False
+        for connection in self._library._connectionCache:
+            if connection.isolated:
+                self._library._end_isolation(connection)
@@ -0,0 +1,237 @@
+#    Copyright (c) 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class _Column(object):
+    """
+    Values of one column.
+    Numbers are kept in typed array with null values stored as 0, other
+    values are kept in list. Type is chosen by the first not null value,
+    column falls back to list if some value does not fit the array.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.values = None
+        # 1 for null value, 0 for not null one.
+        self.nulls = bytearray()
+
+    @property
+    def typed(self):
+        return isinstance(self.values, array)
+
+    def extend(self, values):
+        if self.values is None:
+            self.values = self._storage(values)
+            if self.values is None:
+                # Type is unknown while there are only null values.
+                self.nulls.extend('\x01' * len(values))
+                return
+            self._extend([None] * len(self.nulls))
+
+        self._extend(values)
+        self.nulls.extend(value is None for value in values)
+
+    def _extend(self, values):
+        if not self.typed:
+            self.values.extend(values)
+            return
+
+        try:
+            self.values.extend(array(self.values.typecode,
+                                     [0 if value is None else value
+                                      for value in values]))
+        except (TypeError, OverflowError):
+            self.values = list(self.not_null_or_none())
+            self.values.extend(values)
+
+    @staticmethod
+    def _storage(values):
+        for value in values:
+            if value is None:
+                continue
+            if isinstance(value, float):
+                return array('d')
+            if isinstance(value, (int, long)):
+                return array('l')
+            return []
+
+        return None
+
+    def not_null_or_none(self):
+        """
+        Iterates over values with None in place of null values.
+        """
+
+        if not self.typed or not any(self.nulls):
+            return iter(self.values or [None] * len(self.nulls))
+
+        return (None if null else value
+                for value, null in zip(self.values, self.nulls))
+
+    def not_null(self):
+        """
+        Iterates over not null values.
+        """
+
+        if self.typed and not any(self.nulls):
+            return iter(self.values)
+
+        return (value for value, null in zip(self.values or [], self.nulls)
+                if not null)
+
+    def to_numpy(self):
+        """
+        Converts column into numpy masked array, nulls are masked.
+        """
+
+        if self.typed:
+            # Type codes of array module and numpy mean the same C types.
+            data = numpy.frombuffer(self.values, dtype=self.values.typecode)
+        else:
+            data = numpy.array(list(self.not_null_or_none()), dtype=object)
+
+        return numpy.ma.masked_array(
+            data, mask=numpy.frombuffer(bytes(self.nulls), dtype=numpy.bool_))
+
+
+class ColumnarResult(object):
+    """
+    Query result that keeps values column by column instead of row tuples.
+    Numeric columns are stored in typed arrays, so big results take several
+    times less memory, and aggregations are computed over whole columns.
+    Columns are referenced by name or by index.
+    """
+
+    def __init__(self, columnNames):
+        self._columns = [_Column(name) for name in columnNames]
+        self._indexes = dict((name.lower(), index)
+                             for index, name in enumerate(columnNames))
+        self.rowsNumber = 0
+
+    @property
+    def columnNames(self):
+        return [column.name for column in self._columns]
+
+    def __len__(self):
+        return self.rowsNumber
+
+    def append_rows(self, rows):
+        """
+        Adds batch of rows to result.
+        """
+
+        for column, values in zip(self._columns, zip(*rows)):
+            column.extend(values)
+        self.rowsNumber += len(rows)
+
+    def _column(self, column):
+        if isinstance(column, basestring):
+            if column.lower() not in self._indexes:
+                try:
+                    column = int(column)
+                except ValueError:
+                    raise KeyError("Column '%s' does not exist." % column)
+            else:
+                column = self._indexes[column.lower()]
+
+        return self._columns[column]
+
+    def values(self, column):
+        """
+        Gets list of column values with None for null values.
+        """
+
+        return list(self._column(column).not_null_or_none())
+
+    def to_numpy(self, column):
+        """
+        Gets column as numpy masked array, null values are masked.
+        Requires numpy package.
+        """
+
+        assert numpy is not None, "numpy package is not installed."
+        return self._column(column).to_numpy()
+
+    def null_count(self, column):
+        """
+        Gets number of null values in column.
+        """
+
+        return self._column(column).nulls.count('\x01')
+
+    def sum(self, column):
+        """
+        Gets sum of not null values of column.
+        """
+
+        column = self._column(column)
+        if column.typed:
+            # Null values are stored as 0 and do not change the sum.
+            return sum(column.values)
+
+        return sum(column.not_null())
+
+    def min(self, column):
+        """
+        Gets minimal not null value of column or None if there is no one.
+        """
+
+        try:
+            return min(self._column(column).not_null())
+        except ValueError:
+            return None
+
+    def max(self, column):
+        """
+        Gets maximal not null value of column or None if there is no one.
+        """
+
+        try:
+            return max(self._column(column).not_null())
+        except ValueError:
+            return None
+
+    def distinct_count(self, column):
+        """
+        Gets number of distinct not null values of column.
+        """
+
+        return len(set(self._column(column).not_null()))
+
+    def contains(self, column, value):
+        """
+        Checks whether column contains value, None checks null values.
+        """
+
+        column = self._column(column)
+        if value is None:
+            return '\x01' in column.nulls
+
+        return value in column.not_null()
+
+    def values_not_in(self, column, allowedValues):
+        """
+        Gets distinct not null values of column that are not allowed.
+        """
+
+        return sorted(set(self._column(column).not_null()) -
+                      set(allowedValues))
@@ -12,7 +12,61 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import re
+import time
 from robot.api import logger
+from robot.libraries.BuiltIn import BuiltIn, RobotNotRunningError
+
+
+# Statements that change schema and make cached metadata stale, leading
+# comments are skipped.
+_DDL_PATTERN = re.compile(r'(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/)*'
+                          r'(CREATE|ALTER|DROP|RENAME|COMMENT)\b',
+                          re.IGNORECASE | re.DOTALL)
+# Statements that only read data, WITH statements could contain writes.
+_SELECT_PATTERN = re.compile(r'(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/)*'
+                             r'SELECT\b', re.IGNORECASE | re.DOTALL)
+
+
+def _is_plain_select(sqlStatement):
+    """
+    Checks whether statement is a single SELECT that does not change data.
+    """
+
+    return bool(_SELECT_PATTERN.match(sqlStatement)) and \
+        ';' not in sqlStatement.strip().rstrip(';')
+
+
+def _is_debug_logged():
+    """
+    Checks whether debug messages are written with current log level.
+    """
+
+    try:
+        level = BuiltIn().get_variable_value('${LOG LEVEL}')
+    except RobotNotRunningError:
+        return False
+
+    return level in ('TRACE', 'DEBUG')
+
+
+class _Rows(object):
+    """
+    Query result that is formatted only when message is built.
+    Not more than limit rows are shown, others are summarized.
+    """
+
+    def __init__(self, rows, limit):
+        self._rows = rows
+        self._limit = limit
+
+    def __str__(self):
+        shown = self._rows[:self._limit]
+        text = '[%s]' % ', '.join(repr(row) for row in shown)
+        if len(self._rows) > len(shown):
+            text += ' and %s more row(s)' % (len(self._rows) - len(shown))
+
+        return text
 
 
 class _CommonActions(object):
@@ -20,29 +74,495 @@ class _CommonActions(object):
     Class that contains common keywords for all libraries.
     """
 
-    def _execute_sql(self, sqlStatement, commitNeeded=False):
+    # Number of rows that is shown in log and failure messages.
+    _sampleRowsNumber = 10
+    # Number of rows fetched at once by keywords that stream results.
+    _batchSize = 1000
+    # QueryStatistics object if query statistics are collected.
+    _queryStatistics = None
+    # QueryCache object if results of queries are cached.
+    _queryCache = None
+    # Maximal number of connections to one database used at once by
+    # keywords that run queries concurrently.
+    _concurrentConnections = 4
+    # Whether debug messages are logged, None if log level is not checked
+    # yet. It is reset by library listener when suite or test starts.
+    _debugLogged = None
+
+    def _execute_sql(self, sqlStatement, commitNeeded=False, parameters=None,
+                     connection=None):
         """
         Executes sql.
 
         *Arguments:*
             - sqlStatement: string, sql statement.
             - commitNeeded: bool, if True - commit will be performed after
-             executing statement.
+             executing statement unless transaction block is open.
+            - parameters: list, bind parameters for placeholders of \
+            sqlStatement in the driver paramstyle.
+            - connection: object, connection to execute statement on, \
+            current connection if not specified.
 
         *Return:*
-            - Database cursor object.
+            - Database cursor object. Cursor is reused by the next statement \
+            on the same connection, so result should be consumed before it.
         """
 
-        try:
-            cur = self._connectionCache.current.connection.cursor()
+        current = connection or self._connectionCache.current
+        cur = current.cursor()
+        statistics = self._queryStatistics
+        committed = False
 
-            logger.debug("Executing: %s" % sqlStatement)
-            cur.execute(sqlStatement)
-            if commitNeeded:
-                self._connectionCache.current.connection.commit()
+        try:
+            self._debug("Executing: %s", sqlStatement)
+            self._invalidate_metadata_on_ddl(current, [sqlStatement])
+            if not _is_plain_select(sqlStatement):
+                self._invalidate_results(current)
+            start = time.time()
+            if parameters is None:
+                cur.execute(sqlStatement)
+            else:
+                parameters = tuple(parameters)
+                self._debug("Parameters: %s", parameters)
+                preparedStatement = \
+                    current.prepared_statement(sqlStatement, len(parameters))
+                cur.execute(preparedStatement or sqlStatement, parameters)
+            if statistics is not None:
+                statistics = statistics.add_execute(sqlStatement,
+                                                    current.alias,
+                                                    time.time() - start)
+            if commitNeeded and not current.transactionBlock:
+                start = time.time()
+                current.connection.commit()
+                committed = True
+                if statistics is not None:
+                    statistics.add_fetch(time.time() - start, [])
+            if statistics is not None:
+                return self._queryStatistics.timed_cursor(cur, statistics)
             return cur
 
         finally:
-            if cur:
-                logger.debug("Rolling back: %s" % sqlStatement)
-                self._connectionCache.current.connection.rollback()
+            self._end_transaction(current, sqlStatement, committed)
+
+    def _execute_batch(self, connection, statements, executedNumber=0):
+        """
+        Executes batch of statements without committing them.
+
+        *Arguments:*
+            - connection: object, library connection.
+            - statements: list, sql statements.
+            - executedNumber: int, number of previously executed statements, \
+            it is used in failure message.
+
+        *Return:*
+            - None
+        """
+
+        self._invalidate_metadata_on_ddl(connection, statements)
+        self._invalidate_results(connection)
+        if connection.dialect.multiStatements:
+            # Semicolon is put on its own line, so line comment at the end
+            # of statement does not hide it.
+            statements = ['\n;\n'.join(statements)]
+
+        cur = connection.cursor()
+        for number, statement in enumerate(statements):
+            start = time.time()
+            try:
+                cur.execute(statement)
+            except Exception:
+                logger.info("Failed to execute statement(s) starting from "
+                            "number %s:\n%s" %
+                            (executedNumber + number + 1, statement))
+                raise
+            if self._queryStatistics is not None:
+                self._queryStatistics.add_execute(statement, connection.alias,
+                                                  time.time() - start)
+
+    def _metadata(self, connection, key, load):
+        """
+        Gets schema metadata cached on connection.
+        Metadata is loaded on the first use and kept until schema is
+        changed through the library or cache is invalidated.
+
+        *Arguments:*
+            - connection: object, library connection.
+            - key: tuple, kind of metadata and its parameters.
+            - load: callable, loads metadata from database.
+
+        *Return:*
+            - Metadata value.
+        """
+
+        if key not in connection.metadata:
+            connection.metadata[key] = load()
+
+        return connection.metadata[key]
+
+    def _catalog(self, connection, query, *args):
+        """
+        Runs catalog query of dialect and ends transaction it opened.
+
+        *Arguments:*
+            - connection: object, library connection.
+            - query: bound method of dialect that gets cursor as the first \
+            argument.
+            - args: other arguments of query.
+
+        *Return:*
+            - Result of query.
+        """
+
+        try:
+            return query(connection.cursor(), *args)
+        finally:
+            self._end_transaction(connection, query.__name__)
+
+    def _invalidate_metadata_on_ddl(self, connection, statements):
+        """
+        Clears metadata cache of connection if any statement changes schema.
+        """
+
+        if connection.metadata and any(_DDL_PATTERN.match(statement)
+                                       for statement in statements):
+            self._debug("Schema is changed, metadata cache is cleared.")
+            connection.metadata.clear()
+
+    def _invalidate_results(self, connection):
+        """
+        Drops cached query results of connection, it is called before
+        statements that could change data.
+        """
+
+        if self._queryCache is not None:
+            self._queryCache.invalidate(connection)
+
+    def _begin_transaction(self, connection):
+        """
+        Opens transaction for statements that are committed together unless
+        transaction block is already open.
+        """
+
+        if not connection.transactionBlock:
+            connection.dialect.begin(connection.connection)
+
+    def _end_transaction(self, connection, sqlStatement, committed=False):
+        """
+        Rolls back transaction left open by statement.
+        Rollback is skipped if transaction was committed, if connection
+        has no open transaction or if transaction block is open.
+
+        *Arguments:*
+            - connection: object, library connection.
+            - sqlStatement: string, executed sql statement.
+            - committed: bool, True if statement was committed.
+
+        *Return:*
+            - None
+        """
+
+        if (not committed and not connection.transactionBlock and
+                connection.in_transaction()):
+            self._debug("Rolling back: %s", sqlStatement)
+            connection.connection.rollback()
+
+    def _debug(self, message, *args):
+        """
+        Logs debug message.
+        Message is formatted only if debug messages are logged, so big
+        results could be passed as arguments wrapped into _Rows.
+
+        *Arguments:*
+            - message: string, message with formatting placeholders.
+            - args: values for placeholders.
+
+        *Return:*
+            - None
+        """
+
+        if self._debugLogged is None:
+            self._debugLogged = _is_debug_logged()
+        if self._debugLogged:
+            logger.debug(message % args)
+
+    def _rows(self, rows):
+        """
+        Wraps rows so only first of them are shown in messages.
+        """
+
+        return _Rows(rows, self._sampleRowsNumber)
+
+    @staticmethod
+    def _wrappable_statement(selectStatement):
+        """
+        Prepares select statement to be used as a subquery.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+
+        *Return:*
+            - Statement without trailing semicolon or None if statement \
+            could not be wrapped.
+        """
+
+        statement = selectStatement.strip().rstrip(';').strip()
+        firstWord = statement.split(None, 1)[0].upper() if statement else ''
+
+        if firstWord not in ('SELECT', 'WITH') or ';' in statement:
+            return None
+
+        return statement
+
+    def _count_rows(self, selectStatement, limit=None, parameters=None):
+        """
+        Counts rows of select statement on the database side.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+            - limit: int, if specified - counting stops after this number \
+            of rows, so returned value is never greater than limit.
+            - parameters: list, bind parameters of select statement.
+
+        *Return:*
+            - int, rows count.
+        """
+
+        current = self._connectionCache.current
+        try:
+            statement = self._wrappable_statement(selectStatement)
+            if statement is not None:
+                dialect = current.dialect
+                if limit is not None and dialect.supportsLimit:
+                    statement = dialect.limit('SELECT 1 FROM (%s) pydb_rows'
+                                              % statement, limit)
+                cur = self._execute_wrapped(dialect.count(statement),
+                                            parameters)
+                if cur is not None:
+                    return cur.fetchone()[0]
+
+            logger.debug("Rows count will be taken from cursor: %s" %
+                         selectStatement)
+            cur = self._execute_sql(selectStatement, parameters=parameters)
+            if cur.rowcount >= 0:
+                return cur.rowcount
+
+            # Driver does not know rows count of select, so rows are
+            # fetched.
+            count = 0
+            while limit is None or count < limit:
+                rows = cur.fetchmany(self._batchSize)
+                if not rows:
+                    break
+                count += len(rows)
+
+            return count if limit is None else min(count, limit)
+
+        finally:
+            # Cursor is closed, so it does not keep the rest of result.
+            current.close_cursor()
+
+    def _probe_rows(self, selectStatement, rowsNumber):
+        """
+        Fetches not more than rowsNumber rows of select statement.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+            - rowsNumber: int, maximal number of rows to fetch.
+
+        *Return:*
+            - List of fetched rows.
+        """
+
+        statement = self._wrappable_statement(selectStatement)
+        current = self._connectionCache.current
+        dialect = current.dialect
+
+        try:
+            if statement is not None and dialect.supportsLimit:
+                cur = self._execute_wrapped(
+                    dialect.limit('SELECT * FROM (%s) pydb_probe' % statement,
+                                  rowsNumber))
+                if cur is not None:
+                    return list(cur.fetchall())
+
+            return list(
+                self._execute_sql(selectStatement).fetchmany(rowsNumber))
+
+        finally:
+            # Cursor is closed, so it does not keep the rest of result.
+            current.close_cursor()
+
+    def _execute_wrapped(self, sqlStatement, parameters=None):
+        """
+        Executes statement built around select statement given by user.
+        Such statement fails for some selects, e.g. with duplicated column
+        names or with own limiting clause, then the original statement
+        should be executed instead.
+
+        *Arguments:*
+            - sqlStatement: string, sql statement with wrapped select.
+            - parameters: list, bind parameters of select statement.
+
+        *Return:*
+            - Database cursor object or None if statement failed.
+        """
+
+        current = self._connectionCache.current
+        try:
+            return self._execute_sql(sqlStatement, parameters=parameters)
+        except Exception as e:
+            # Failed statement aborts transaction of some databases, so
+            # the original statement could not be executed after it.
+            if (current.transactionBlock and
+                    current.dialect.failedStatementAbortsTransaction):
+                raise
+            logger.debug("Wrapped statement failed, original one will be "
+                         "executed: %s" % e)
+            return None
+
+    def _stream_rows(self, selectStatement, batchSize=None, connection=None,
+                     parameters=None, withDescription=False):
+        """
+        Executes select statement and yields its rows in batches, so only \
+        one batch is kept in memory at once.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+            - batchSize: int, number of rows in batch, library default is \
+            used if not specified.
+            - connection: object, connection to execute statement on, \
+            current connection if not specified.
+            - parameters: list, bind parameters of select statement.
+            - withDescription: bool, if true, then cursor description is \
+            yielded before the first batch. It is read after the first \
+            fetch, server-side cursors do not describe result before it.
+
+        *Return:*
+            - Generator of row lists.
+        """
+
+        batchSize = int(batchSize or self._batchSize)
+        current = connection or self._connectionCache.current
+        cur = current.dialect.streaming_cursor(current.connection)
+
+        try:
+            self._debug("Executing in batches of %s rows: %s", batchSize,
+                        selectStatement)
+            start = time.time()
+            if parameters is None:
+                cur.execute(selectStatement)
+            else:
+                cur.execute(selectStatement, tuple(parameters))
+            if current.dialect.holdStreams and not current.transactionBlock:
+                # Keywords run between batches could roll back transaction
+                # on the same connection, committed cursor outlives it.
+                current.connection.commit()
+            if self._queryStatistics is not None:
+                statistics = self._queryStatistics.add_execute(
+                    selectStatement, current.alias, time.time() - start)
+                cur = self._queryStatistics.timed_cursor(cur, statistics)
+            rows = cur.fetchmany(batchSize)
+            if withDescription:
+                yield cur.description
+            while rows:
+                yield rows
+                rows = cur.fetchmany(batchSize)
+
+        finally:
+            cur.close()
+            self._end_transaction(current, selectStatement)
+
+
+def _hashable(value):
+    """
+    Converts unhashable value, e.g. dict or list of json column, into its
+    representation that does not depend on order of dict keys.
+    """
+
+    if isinstance(value, dict):
+        return repr(sorted(value.items()))
+    if isinstance(value, list):
+        return repr(value)
+    return value
+
+
+class _ResultsDiff(object):
+    """
+    Multiset difference between expected and actual rows.
+    Rows that are present in both results cancel each other, so for
+    similarly sorted results only a small number of rows is kept.
+    Missing and extra rows with the same values in the first
+    keyColumnsNumber columns are reported as changed.
+    """
+
+    def __init__(self, keyColumnsNumber=1):
+        self._counter = {}
+        self._keyColumnsNumber = keyColumnsNumber
+
+    @property
+    def isEmpty(self):
+        return not self._counter
+
+    def add_expected(self, rows):
+        self._add(rows, 1)
+
+    def add_actual(self, rows):
+        self._add(rows, -1)
+
+    def _add(self, rows, sign):
+        counter = self._counter
+        for row in rows:
+            row = tuple(row)
+            try:
+                hash(row)
+            except TypeError:
+                # Values like dicts of json columns are compared by their
+                # representation.
+                row = tuple(_hashable(value) for value in row)
+            count = counter.get(row, 0) + sign
+            if count:
+                counter[row] = count
+            else:
+                del counter[row]
+
+    def report(self, selectStatement, expectedAlias, actualAlias, sampleSize):
+        """
+        Builds readable description of the difference.
+
+        *Arguments:*
+            - selectStatement: string, compared sql select statement.
+            - expectedAlias: string or int, alias of expected database.
+            - actualAlias: string or int, alias of actual database.
+            - sampleSize: int, maximal number of shown rows of each kind.
+
+        *Return:*
+            - string, difference description.
+        """
+
+        missing = {}
+        extra = {}
+        for row, count in sorted(self._counter.items()):
+            rows = missing if count > 0 else extra
+            rows.setdefault(row[:self._keyColumnsNumber], []).extend(
+                [row] * abs(count))
+
+        changed = []
+        for key in sorted(set(missing) & set(extra)):
+            while missing[key] and extra[key]:
+                changed.append((missing[key].pop(0), extra[key].pop(0)))
+        missing = [row for rows in missing.values() for row in rows]
+        extra = [row for rows in extra.values() for row in rows]
+
+        lines = ["Expected to have equal elements from '%s' on %s and %s "
+                 "databases but %s row(s) are missing, %s row(s) are extra "
+                 "and %s row(s) are changed." %
+                 (selectStatement, expectedAlias, actualAlias, len(missing),
+                  len(extra), len(changed))]
+        lines.extend('Missing: %s' % (row,)
+                     for row in sorted(missing)[:sampleSize])
+        lines.extend('Extra: %s' % (row,)
+                     for row in sorted(extra)[:sampleSize])
+        lines.extend('Changed: %s -> %s' % (expected, actual)
+                     for expected, actual in changed[:sampleSize])
+
+        return '\n'.join(lines)
@@ -12,8 +12,163 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import csv
+import gzip
+import io
+import os
+import re
+from itertools import islice
+from multiprocessing.pool import ThreadPool
+from Queue import Queue
 from robot.api import logger
-from _common import _CommonActions
+from robot.libraries.BuiltIn import BuiltIn, RobotNotRunningError
+from _common import _CommonActions, _ResultsDiff, _is_plain_select
+from _columnar import ColumnarResult
+from _named_rows import row_class
+from ..utils import _to_bool
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+_CSV_DIALECTS = {'csv': 'excel', 'tsv': 'excel-tab'}
+
+
+def _row_evaluator(condition):
+    """
+    Builds function that evaluates condition for row like BuiltIn keyword
+    Evaluate does, row is available as 'row' variable. Plain python eval is
+    used if Robot Framework is not running.
+    """
+
+    builtIn = BuiltIn()
+    try:
+        builtIn.evaluate('True')
+    except RobotNotRunningError:
+        expression = compile(condition, '<condition>', 'eval')
+        return lambda row: eval(expression, {}, {'row': row})
+
+    return lambda row: builtIn.evaluate(condition, namespace={'row': row})
+
+
+def _parquet_schema(rows, description, dbModule):
+    """
+    Builds schema of parquet file from the first batch of rows. Type of
+    column that has only nulls in the batch is taken from cursor type code
+    compared with DB API type objects of driver module, string type is
+    used if type code is not recognized.
+    """
+
+    typeObjects = [(getattr(dbModule, 'STRING', None), pyarrow.string()),
+                   (getattr(dbModule, 'BINARY', None), pyarrow.binary()),
+                   (getattr(dbModule, 'NUMBER', None), pyarrow.float64()),
+                   (getattr(dbModule, 'DATETIME', None),
+                    pyarrow.timestamp('us'))]
+    columns = zip(*rows) if rows else [()] * len(description)
+    fields = []
+    for column, values in zip(description, columns):
+        arrowType = pyarrow.array(values).type
+        if pyarrow.types.is_null(arrowType):
+            arrowType = next((columnType
+                              for typeObject, columnType in typeObjects
+                              if typeObject is not None and
+                              column[1] == typeObject), pyarrow.string())
+        fields.append(pyarrow.field(column[0], arrowType))
+
+    return pyarrow.schema(fields)
+
+
+# Tokens that change meaning of the following text in sql script.
+_SPECIAL_TOKEN_PATTERN = re.compile(r"[;'\"`$]|--|/\*")
+# Dollar sign inside identifier like a$b does not start dollar quote.
+_DOLLAR_QUOTE_PATTERN = re.compile(r'(?<![\w$])\$(?:[A-Za-z_]\w*)?\$')
+# Prefix of postgres escape string E'...', backslash escapes quote in it.
+_ESCAPE_STRING_PATTERN = re.compile(r"(?<![\w$])[Ee]'")
+
+
+def _split_statements(lines, backslashEscapes=False):
+    """
+    Splits sql script into statements divided by semicolons.
+    Semicolons inside quoted text, escape strings, dollar-quoted text and
+    comments do not divide statements. Lines are processed one by one, so
+    script is never kept in memory.
+
+    *Arguments:*
+        - lines: iterable of strings, lines of sql script.
+        - backslashEscapes: bool, if True - backslash escapes quote \
+        characters inside quoted text.
+
+    *Return:*
+        - Generator of statements without trailing semicolons, statements \
+        that consist only of comments are skipped.
+    """
+
+    parts = []
+    hasCode = False
+    # Closing token of quoted text or block comment the text is inside.
+    closing = None
+    # Whether backslash escapes characters of quoted text.
+    escaped = False
+
+    for line in lines:
+        position = 0
+        while position < len(line):
+            if closing is not None:
+                end = line.find(closing, position)
+                if escaped:
+                    escape = line.find('\\', position)
+                    if escape != -1 and (end == -1 or escape < end):
+                        parts.append(line[position:escape + 2])
+                        position = escape + 2
+                        continue
+                if end == -1:
+                    parts.append(line[position:])
+                    break
+                end += len(closing)
+                parts.append(line[position:end])
+                position = end
+                closing = None
+                escaped = False
+                continue
+
+            match = _SPECIAL_TOKEN_PATTERN.search(line, position)
+            start = match.start() if match else len(line)
+            parts.append(line[position:start])
+            hasCode = hasCode or bool(line[position:start].strip())
+            if match is None:
+                break
+
+            token = match.group()
+            if token == ';':
+                if hasCode:
+                    yield ''.join(parts).strip()
+                parts = []
+                hasCode = False
+            elif token == '--':
+                parts.append(line[start:])
+                break
+            elif token == '/*':
+                closing = '*/'
+            elif token == '$':
+                dollarQuote = _DOLLAR_QUOTE_PATTERN.match(line, start)
+                hasCode = True
+                if dollarQuote is not None:
+                    token = closing = dollarQuote.group()
+            else:
+                closing = token
+                hasCode = True
+                escaped = backslashEscapes and token in ("'", '"') or \
+                    start > 0 and \
+                    bool(_ESCAPE_STRING_PATTERN.match(line, start - 1))
+
+            if token != ';':
+                parts.append(token)
+            position = start + len(token)
+
+    if hasCode:
+        yield ''.join(parts).strip()
 
 
 class _ExecutionKeywords(_CommonActions):
@@ -21,25 +176,317 @@ class _ExecutionKeywords(_CommonActions):
     Class that handles all keywords from group 'Execution'.
     """
 
-    def query(self, selectStatement):
+    def query(self, selectStatement, parameters=None, namedRows=False):
         """
         Performs query.
+        Rows are tuples, with namedRows argument their values could also \
+        be accessed by column name as key or attribute. Such rows are still \
+        tuples and share one index of column names, so they take no more \
+        memory than plain rows. Columns named 'count' or 'index' are \
+        accessed only by key, because attributes with these names are \
+        methods of tuple.
+        If library is imported with queryCacheSize argument, then result \
+        of plain select, not WITH statement, is cached and the same query \
+        with the same parameters on the same connection is answered from \
+        cache until any other statement than select is executed on the \
+        connection, connection is closed or result expires. Changes made by \
+        other connections and by functions called from select statements \
+        are not tracked.
 
         *Arguments:*
             - selectStatement: string, sql select statement.
+            - parameters: list, bind parameters for placeholders of \
+            statement in the driver paramstyle.
+            - namedRows: bool, if true, then rows with access by column \
+            name are returned.
 
         *Return:*
             - Fetched result of performed query.
 
         *Examples:*
         | @{queryResults} | Query | select * from employee |
+        | @{queryResults} | Query | select * from employee where age=%s \
+        | ${parameters} |
+        | @{queryResults} | Query | select * from employee \
+        | namedRows=True |
+        | Should Be Equal | ${queryResults[0].first_name} | Max |
+        | Should Be Equal | ${queryResults[0]['count']} | ${1} |
         """
 
-        cur = self._execute_sql(selectStatement)
-        result = cur.fetchall()
+        namedRows = _to_bool(namedRows)
+        key = None
+        # Statements that could change data are never cached.
+        if self._queryCache is not None and _is_plain_select(selectStatement):
+            key = self._queryCache.key(self._connectionCache.current,
+                                       selectStatement, parameters)
+            # Named and plain rows of the same query are cached separately.
+            key = key and key + (namedRows,)
+            result = self._queryCache.get(key) if key else None
+            if result is not None:
+                self._debug("Result is taken from cache: %s", selectStatement)
+                return list(result)
+
+        current = self._connectionCache.current
+        try:
+            cur = self._execute_sql(selectStatement, parameters=parameters)
+            result = cur.fetchall()
+            if namedRows:
+                rowClass = row_class(cur.description)
+                result = [rowClass(row) for row in result]
+        finally:
+            # Driver could keep copy of result set until cursor is closed.
+            current.close_cursor()
+
+        if key is not None:
+            self._queryCache.put(key, result)
 
         return result
 
+    def query_in_batches(self, selectStatement, keywordName, batchSize=None):
+        """
+        Performs query and runs keyword for every batch of fetched rows.
+        Only one batch is kept in memory at once, so this could be used
+        for assertions and aggregations over big results.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+            - keywordName: string, name of keyword that gets list of rows \
+            as the only argument.
+            - batchSize: int, number of rows in batch, library default is \
+            used if not specified.
+
+        *Return:*
+            - int, number of processed rows.
+
+        *Examples:*
+        | ${rowsNumber} | Query In Batches | select * from employee \
+        | Check Employees | 500 |
+        """
+
+        rowsNumber = 0
+        for rows in self._stream_rows(selectStatement, batchSize):
+            BuiltIn().run_keyword(keywordName, rows)
+            rowsNumber += len(rows)
+
+        logger.debug("Processed %s rows from '%s'." % (rowsNumber,
+                                                       selectStatement))
+        return rowsNumber
+
+    def query_columns(self, selectStatement, batchSize=None,
+                      parameters=None):
+        """
+        Performs query and keeps result column by column.
+        Rows are fetched in batches and their values are moved into \
+        per-column storage: numbers go to typed arrays with separate null \
+        flags, other values go to lists. Big numeric results take several \
+        times less memory than list of row tuples returned by `Query`.
+        Result has methods that work over whole column referenced by name \
+        or index: values, sum, min, max, null_count, distinct_count, \
+        contains, values_not_in and to_numpy, the last one requires numpy \
+        package and returns masked array with null values masked.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+            - batchSize: int, number of rows in batch, library default is \
+            used if not specified.
+            - parameters: list, bind parameters for placeholders of \
+            statement in the driver paramstyle.
+
+        *Return:*
+            - Columnar result of performed query.
+
+        *Examples:*
+        | ${result} | Query Columns | select id, salary from employee |
+        | Should Be Equal As Numbers | ${result.sum('salary')} | 125000 |
+        | Should Be True | ${result.distinct_count('id')} == len($result) |
+        | Should Be Empty | ${result.values_not_in('salary', [0])} |
+        """
+
+        batches = self._stream_rows(selectStatement, batchSize,
+                                    parameters=parameters,
+                                    withDescription=True)
+        result = ColumnarResult([column[0] for column in next(batches)])
+        for rows in batches:
+            result.append_rows(rows)
+
+        logger.debug("Fetched %s rows from '%s' into columns." %
+                     (len(result), selectStatement))
+        return result
+
+    def export_query_to_file(self, selectStatement, filePath,
+                             fileFormat=None, compress=False, batchSize=None,
+                             encoding='utf-8', nullValue='', parameters=None):
+        """
+        Performs query and writes its result to file.
+        Rows are fetched in batches and every batch is written at once, \
+        so memory use does not depend on size of result.
+        Formats are 'csv' and 'tsv' with header row of column names, and \
+        'parquet' columnar binary format that requires pyarrow package. \
+        Format is taken from file extension if not specified, '.gz' \
+        extension turns compression on.
+        Csv and tsv files are compressed with gzip, parquet file is written \
+        with gzip compression of its pages.
+        Types of parquet columns are taken from values of the first batch, \
+        columns that have only nulls in it get type from cursor description.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+            - filePath: string, path to file, existing file is overwritten.
+            - fileFormat: string, 'csv', 'tsv' or 'parquet'.
+            - compress: bool, if true, then file is compressed.
+            - batchSize: int, number of rows in batch, library default is \
+            used if not specified.
+            - encoding: string, encoding of text values in csv and tsv \
+            files.
+            - nullValue: string, text written for nulls in csv and tsv \
+            files, empty by default.
+            - parameters: list, bind parameters for placeholders of \
+            selectStatement in the driver paramstyle.
+
+        *Return:*
+            - list of number of written rows and size of file in bytes.
+
+        *Examples:*
+        | ${rows} | ${bytes} | Export Query To File | select * from employee \
+        | ${OUTPUT DIR}/employee.csv |
+        | Export Query To File | select * from employee \
+        | ${OUTPUT DIR}/employee.tsv.gz |
+        | Export Query To File | select * from employee \
+        | ${OUTPUT DIR}/employee.parquet | compress=True |
+        | Export Query To File | select * from employee where age=%s \
+        | ${OUTPUT DIR}/employee.csv | nullValue=NULL \
+        | parameters=${parameters} |
+        """
+
+        name, extension = os.path.splitext(filePath)
+        compress = _to_bool(compress) or extension.lower() == '.gz'
+        if extension.lower() == '.gz':
+            extension = os.path.splitext(name)[1]
+        fileFormat = (fileFormat or extension.lstrip('.')).lower()
+        assert fileFormat in ('csv', 'tsv', 'parquet'), \
+            ("Expected 'csv', 'tsv' or 'parquet' file format but got '%s'." %
+             fileFormat)
+
+        assert fileFormat != 'parquet' or pyarrow is not None, \
+            "pyarrow package is not installed."
+
+        # Parquet pages are compressed by the writer itself.
+        compressFile = compress and fileFormat != 'parquet'
+        outputFile = (gzip.open if compressFile else open)(filePath, 'wb')
+        batches = self._stream_rows(selectStatement, batchSize,
+                                    parameters=parameters,
+                                    withDescription=True)
+        try:
+            description = next(batches)
+            if fileFormat == 'parquet':
+                rowsNumber = self._write_parquet(
+                    outputFile, description, batches, compress,
+                    self._connectionCache.current.connectArgs[0])
+            else:
+                rowsNumber = self._write_csv(
+                    outputFile, [column[0] for column in description],
+                    batches, _CSV_DIALECTS[fileFormat], encoding, nullValue)
+        finally:
+            batches.close()
+            outputFile.close()
+
+        bytesNumber = os.path.getsize(filePath)
+        logger.info("Exported %s rows from '%s' to %s, %s bytes." %
+                    (rowsNumber, selectStatement, filePath, bytesNumber))
+        return [rowsNumber, bytesNumber]
+
+    @staticmethod
+    def _write_csv(csvFile, columnNames, batches, dialect, encoding,
+                   nullValue):
+        def encoded(value):
+            if value is None:
+                value = nullValue
+            if isinstance(value, unicode):
+                return value.encode(encoding)
+            return value
+
+        rowsNumber = 0
+        writer = csv.writer(csvFile, dialect)
+        writer.writerow([encoded(name) for name in columnNames])
+        for rows in batches:
+            writer.writerows([encoded(value) for value in row]
+                             for row in rows)
+            rowsNumber += len(rows)
+
+        return rowsNumber
+
+    @staticmethod
+    def _write_parquet(parquetFile, description, batches, compress,
+                       dbModule):
+        rows = next(batches, [])
+        # Schema is fixed by the first batch, so only one batch is kept in
+        # memory at once.
+        schema = _parquet_schema(rows, description, dbModule)
+        writer = pyarrow.parquet.ParquetWriter(
+            parquetFile, schema, compression='gzip' if compress else 'snappy')
+
+        rowsNumber = 0
+        try:
+            while rows:
+                writer.write_table(pyarrow.Table.from_arrays(
+                    [pyarrow.array(values, type=field.type)
+                     for values, field in zip(zip(*rows), schema)],
+                    schema.names))
+                rowsNumber += len(rows)
+                rows = next(batches, [])
+        finally:
+            writer.close()
+
+        return rowsNumber
+
+    def every_queried_row_should_satisfy(self, selectStatement, condition,
+                                         batchSize=None):
+        """
+        Checks that every row fetched by query satisfies condition.
+        Rows are fetched in batches, so whole result is never kept in memory.
+        If there will be rows that do not satisfy condition, \
+        then this will throw an AssertionError.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement.
+            - condition: string, python expression that is evaluated for \
+            every row available as 'row' variable like with BuiltIn \
+            `Evaluate` keyword, so modules are imported automatically and \
+            test variables are available with '$' prefix.
+            - batchSize: int, number of rows in batch, library default is \
+            used if not specified.
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | Every Queried Row Should Satisfy | select age, name from employee \
+        | row[0] >= 18 and row[1] |
+        | Every Queried Row Should Satisfy | select age from employee \
+        | row[0] >= $minimalAge |
+        """
+
+        satisfies = _row_evaluator(condition)
+        rowsNumber = 0
+        failedNumber = 0
+        failedRows = []
+
+        for rows in self._stream_rows(selectStatement, batchSize):
+            for row in rows:
+                if not satisfies(row):
+                    failedNumber += 1
+                    if len(failedRows) < self._sampleRowsNumber:
+                        failedRows.append(row)
+            rowsNumber += len(rows)
+
+        assert not failedNumber, \
+            ("Expected all rows from '%s' to satisfy '%s' but %s of %s rows "
+             "do not, first of them: %s." % (selectStatement, condition,
+                                             failedNumber, rowsNumber,
+                                             self._rows(failedRows)))
+        logger.debug("All %s rows from '%s' satisfy '%s'." %
+                     (rowsNumber, selectStatement, condition))
+
     def description(self, selectStatement):
         """
         Gets description of query.
@@ -59,12 +506,16 @@ class _ExecutionKeywords(_CommonActions):
 
         return description
 
-    def execute_sql(self, sqlStatement):
+    def execute_sql(self, sqlStatement, parameters=None):
         """
         Executes sql and commits it.
+        Inside transaction block opened with `Begin Transaction` statement \
+        is committed by `Commit Transaction`.
 
         *Arguments:*
             - sqlStatement: string, sql statement.
+            - parameters: list, bind parameters for placeholders of \
+            statement in the driver paramstyle.
 
         *Return:*
             - None
@@ -73,9 +524,399 @@ class _ExecutionKeywords(_CommonActions):
         | Execute Sql | update name from employee where id=7 |
         """
 
-        self._execute_sql(sqlStatement, True)
+        self._execute_sql(sqlStatement, True, parameters)
+
+    def execute_sql_script(self, scriptPath, batchSize=100, encoding='utf-8'):
+        """
+        Executes statements from sql script file and commits them at once.
+        File is read line by line, so it could be of any size. Statements
+        are divided by semicolons that are not inside quoted text,
+        dollar-quoted text or comments.
+        Statements are sent in batches, for 'psycopg2' driver every batch is
+        sent by one execute. Inside transaction block opened with
+        `Begin Transaction` statements are committed by `Commit Transaction`.
+        If any statement fails, then transaction is rolled back.
+
+        *Arguments:*
+            - scriptPath: string, path to sql script file.
+            - batchSize: int, number of statements in batch.
+            - encoding: string, encoding of script file.
+
+        *Return:*
+            - int, number of executed statements.
+
+        *Examples:*
+        | Execute Sql Script | ${CURDIR}/schema.sql |
+        | Execute Sql Script | ${CURDIR}/fixtures.sql | 1000 |
+        """
+
+        batchSize = int(batchSize)
+        current = self._connectionCache.current
+        committed = False
+        statementsNumber = 0
+
+        with io.open(scriptPath, encoding=encoding) as script:
+            statements = _split_statements(script,
+                                           current.dialect.backslashEscapes)
+            try:
+                self._begin_transaction(current)
+                while True:
+                    batch = list(islice(statements, batchSize))
+                    if not batch:
+                        break
+                    self._execute_batch(current, batch, statementsNumber)
+                    statementsNumber += len(batch)
+                    self._debug("%s statements of '%s' are executed.",
+                                statementsNumber, scriptPath)
+
+                if not current.transactionBlock:
+                    current.connection.commit()
+                    committed = True
+            finally:
+                self._end_transaction(current, scriptPath, committed)
+
+        logger.info("%s statements of '%s' are executed." %
+                    (statementsNumber, scriptPath))
+        return statementsNumber
 
-    def read_single_value_from_table(self, tableName, columnName, whereClause):
+    def run_queries_concurrently(self, *selectStatements):
+        """
+        Performs several queries at the same time on the current database.
+        Queries are sent over up to concurrentConnections connections to \
+        the same database, extra connections are opened on the first use \
+        and are closed with the current connection. Inside transaction \
+        block and test isolation queries are performed one by one on the \
+        current connection, so they see its uncommitted changes and their \
+        changes are rolled back with it.
+        If some queries fail, then this will throw an AssertionError with \
+        errors of all of them.
+
+        *Arguments:*
+            - selectStatements: strings, sql select statements.
+
+        *Return:*
+            - list of fetched results in the order of statements.
+
+        *Examples:*
+        | @{results} | Run Queries Concurrently | select * from employee \
+        | select * from department |
+        """
+
+        return self._run_concurrently([('Query', self.query, (statement,))
+                                       for statement in selectStatements])
+
+    def run_keywords_concurrently(self, *keywordsAndArguments):
+        """
+        Runs several keywords of this library at the same time on the
+        current database, e.g. independent checks of one verification step.
+        Keywords are divided by 'AND' like in 'Run Keywords' of BuiltIn
+        library. Every keyword uses its own connection to the current
+        database in the same way as in `Run Queries Concurrently`. All
+        keywords are run even if some of them fail. Messages of keywords
+        are not logged.
+        If some keywords fail, then this will throw an AssertionError with
+        failures of all of them.
+
+        *Arguments:*
+            - keywordsAndArguments: names of keywords of this library and \
+            their arguments divided by 'AND'.
+
+        *Return:*
+            - list of values returned by keywords.
+
+        *Examples:*
+        | Run Keywords Concurrently | Check If Exists In Database \
+        | select id from employee where name='John' | AND \
+        | Row Count Is Equal To X | select * from department | 3 |
+        """
+
+        calls = []
+        keyword = []
+        for argument in keywordsAndArguments + ('AND',):
+            if argument != 'AND':
+                keyword.append(argument)
+                continue
+
+            assert keyword, "Keyword name is missing before or after 'AND'."
+            name = keyword[0].split('.')[-1]
+            method = getattr(self, name.strip().lower().replace(' ', '_'),
+                             None)
+            assert (method is not None and not name.startswith('_') and
+                    method.__name__ not in ('run_queries_concurrently',
+                                            'run_keywords_concurrently')), \
+                "Keyword '%s' could not be run concurrently." % name
+            calls.append((name, method, keyword[1:]))
+            keyword = []
+
+        return self._run_concurrently(calls)
+
+    def _run_concurrently(self, calls):
+        """
+        Calls library methods at the same time, every method uses its own
+        connection to the current database as current connection.
+
+        *Arguments:*
+            - calls: list of (name, method, arguments) tuples.
+
+        *Return:*
+            - list of values returned by methods.
+        """
+
+        current = self._connectionCache.current
+        # Changes made by extra connections would escape rollback of
+        # transaction block or test isolation.
+        if current.transactionBlock or current.isolated:
+            connections = [current]
+        else:
+            connections = self._worker_connections(
+                current, min(len(calls), self._concurrentConnections))
+
+        idle = Queue()
+        for connection in connections:
+            idle.put(connection)
+
+        def run(call):
+            name, method, arguments = call
+            connection = idle.get()
+            self._connectionCache.use_in_thread(connection)
+            try:
+                return True, method(*arguments)
+            except Exception as e:
+                return False, '%s: %s' % (type(e).__name__, e)
+            finally:
+                self._connectionCache.use_in_thread(None)
+                idle.put(connection)
+
+        pool = ThreadPool(len(connections))
+        try:
+            results = pool.map(run, calls)
+        finally:
+            pool.close()
+            pool.join()
+
+        failures = ['%s. %s failed with %s' % (number + 1, call[0], result)
+                    for number, (call, (passed, result))
+                    in enumerate(zip(calls, results)) if not passed]
+        assert not failures, ("%s of %s failed:\n%s" %
+                              (len(failures), len(calls),
+                               '\n'.join(failures)))
+        logger.debug("%s keywords passed on %s connection(s)." %
+                      (len(calls), len(connections)))
+
+        return [result for passed, result in results]
+
+    def begin_transaction(self):
+        """
+        Opens transaction block on the current database.
+        Statements executed until `Commit Transaction` or \
+        `Rollback Transaction` are neither committed nor rolled back one by \
+        one, so they are committed at once or could be discarded at once \
+        to clean up after test.
+
+        *Arguments:*
+            - None
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | Begin Transaction |
+        | Execute Sql | insert into employee values (1, 'John') |
+        | Execute Sql | insert into employee values (2, 'Jane') |
+        | Commit Transaction |
+        """
+
+        current = self._connectionCache.current
+        if current.isolated:
+            # Outer transaction is rolled back at the end of test, so block
+            # is a savepoint inside it.
+            assert not current.savepoint, "Transaction block is already open."
+            self._execute_sql('SAVEPOINT pydb_transaction')
+            current.savepoint = True
+        else:
+            assert not current.transactionBlock, \
+                "Transaction block is already open."
+            self._begin_transaction(current)
+            current.transactionBlock = True
+
+        logger.debug("Transaction block is open.")
+
+    def commit_transaction(self):
+        """
+        Commits statements executed since `Begin Transaction` and closes
+        transaction block.
+
+        *Arguments:*
+            - None
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | Commit Transaction |
+        """
+
+        if self._end_transaction_block():
+            self._execute_sql('RELEASE SAVEPOINT pydb_transaction')
+        else:
+            self._connectionCache.current.connection.commit()
+        logger.debug("Transaction block is committed.")
+
+    def rollback_transaction(self):
+        """
+        Rolls back statements executed since `Begin Transaction` and closes
+        transaction block.
+
+        *Arguments:*
+            - None
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | Rollback Transaction |
+        """
+
+        current = self._connectionCache.current
+        if self._end_transaction_block():
+            self._execute_sql('ROLLBACK TO SAVEPOINT pydb_transaction')
+        else:
+            self._invalidate_results(current)
+            current.connection.rollback()
+        # Schema changes are rolled back too by some databases.
+        current.metadata.clear()
+        logger.debug("Transaction block is rolled back.")
+
+    def get_query_cache_statistics(self):
+        """
+        Gets counters of `Query` results cache.
+
+        *Arguments:*
+            - None
+
+        *Return:*
+            - dict with hits, misses, entries and rows keys.
+
+        *Examples:*
+        | ${statistics} | Get Query Cache Statistics |
+        """
+
+        assert self._queryCache is not None, \
+            "Query cache is disabled, import library with queryCacheSize."
+
+        statistics = self._queryCache.statistics()
+        logger.info("Query cache: %(hits)s hit(s), %(misses)s miss(es), "
+                    "%(entries)s result(s) of %(rows)s row(s) are cached." %
+                    statistics)
+
+        return statistics
+
+    def clear_query_cache(self):
+        """
+        Removes all cached results of queries and resets cache counters.
+
+        *Arguments:*
+            - None
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | Clear Query Cache |
+        """
+
+        if self._queryCache is not None:
+            self._queryCache.clear()
+
+    def _end_transaction_block(self):
+        """
+        Closes transaction block of the current database.
+
+        *Return:*
+            - bool, True if block is a savepoint inside test isolation.
+        """
+
+        current = self._connectionCache.current
+        if current.isolated:
+            assert current.savepoint, "Transaction block is not open."
+            current.savepoint = False
+            return True
+
+        assert current.transactionBlock, "Transaction block is not open."
+        current.transactionBlock = False
+
+        return False
+
+    def begin_test_isolation(self, aliasOrIndex=None):
+        """
+        Starts isolation of test changes on database.
+        Statements executed until `End Test Isolation` are not committed, so
+        all changes of test are discarded by one rollback regardless of
+        their size. Transaction blocks opened inside isolation are
+        savepoints.
+        Library imported with testIsolation argument isolates every test
+        on all open databases automatically.
+
+        *Note:* Some databases, e.g. MySQL, commit implicitly when schema \
+        is changed, so such changes could not be discarded.
+
+        *Arguments:*
+            - aliasOrIndex: string or int, alias or index of database, \
+            current database if not specified.
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | [Setup] | Begin Test Isolation |
+        | [Teardown] | End Test Isolation |
+        """
+
+        connection = self._get_connection(aliasOrIndex)
+        assert not connection.transactionBlock, \
+            "Transaction block or test isolation is already open."
+
+        self._begin_isolation(connection)
+
+    def end_test_isolation(self, aliasOrIndex=None):
+        """
+        Discards all changes made since `Begin Test Isolation`.
+
+        *Arguments:*
+            - aliasOrIndex: string or int, alias or index of database, \
+            current database if not specified.
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | End Test Isolation |
+        """
+
+        connection = self._get_connection(aliasOrIndex)
+        assert connection.isolated, "Test isolation is not started."
+
+        self._end_isolation(connection)
+
+    def _begin_isolation(self, connection):
+        self._begin_transaction(connection)
+        connection.transactionBlock = True
+        connection.isolated = True
+        logger.debug("Test isolation is started on %s database." %
+                     connection.alias)
+
+    def _end_isolation(self, connection):
+        connection.transactionBlock = False
+        connection.isolated = False
+        connection.savepoint = False
+        self._invalidate_results(connection)
+        connection.connection.rollback()
+        connection.metadata.clear()
+        logger.debug("Changes of test are rolled back on %s database." %
+                     connection.alias)
+
+    def read_single_value_from_table(self, tableName, columnName, whereClause,
+                                     parameters=None, namedRows=False):
         """
         Reads single value from table.
         If there will be more than one row that satisfies performed query, \
@@ -84,6 +925,11 @@ class _ExecutionKeywords(_CommonActions):
         *Arguments:*
             - tableName: string, table name.
             - columnName: string, column name or names divided by comma.
+            - whereClause: string, where-clause.
+            - parameters: list, bind parameters for placeholders of \
+            where-clause in the driver paramstyle.
+            - namedRows: bool, if true, then row with access by column \
+            name is returned.
 
         *Return:*
             - Fetched single value.
@@ -91,34 +937,48 @@ class _ExecutionKeywords(_CommonActions):
         *Examples:*
         | @{queryResult} | Read Single Value From Table | employee \
         | name, surname | age=27 |
+        | @{queryResult} | Read Single Value From Table | employee \
+        | name, surname | age=%s | ${parameters} |
+        | ${row} | Read Single Value From Table | employee \
+        | name, surname | age=27 | namedRows=True |
+        | Should Be Equal | ${row.surname} | Beloborodko |
         """
 
         sqlStatement = 'SELECT %s FROM %s WHERE %s' % (columnName, tableName,
                                                        whereClause)
 
-        result = self.query(sqlStatement)
+        result = self.query(sqlStatement, parameters, namedRows)
 
         assert len(result) == 1, \
             ("Expected to have 1 row from '%s' "
-                "but got %s rows : %s." % (sqlStatement, len(result), result))
-        logger.debug("Got 1 row from %s: %s." % (sqlStatement, result))
+                "but got %s rows : %s." % (sqlStatement, len(result),
+                                           self._rows(result)))
+        self._debug("Got 1 row from %s: %s.", sqlStatement, result[0])
 
         return result[0]
 
     def db_elements_are_equal(self, selectStatement, firstAliasOrIndex,
-                              secondAliasOrIndex):
+                              *otherAliasesOrIndexes):
         """
-        Checks that fetched results of performed query on two
+        Checks that fetched results of performed query on two or more
         databases are equal.
+        Results are compared as multisets, so duplicated rows are taken into
+        account and order of rows does not matter. Query is performed on all
+        databases at the same time and results are compared batch by batch,
+        rows that are present in all results cancel each other, so results
+        that come in similar order are never kept in memory. Add order-by
+        clause to query to keep memory use low for big results.
         If DB elements will not be equal, then this will
-        throw an AssertionError.
+        throw an AssertionError that shows first missing, extra and changed
+        rows. Rows with the same value in the first column are reported as
+        changed.
 
         *Arguments:*
             - selectStatement: string, sql select statement.
             - firstAliasOrIndex: string or int, alias or index of \
             first database.
-            - secondAliasOrIndex: string or int, alias or index of \
-            second database.
+            - otherAliasesOrIndexes: strings or ints, aliases or indexes \
+            of databases that are compared with first one.
 
         *Return:*
             - None
@@ -126,24 +986,30 @@ class _ExecutionKeywords(_CommonActions):
         *Examples:*
         | DB Elements Are Equal | select name, surname from employee | \
         SomeCompanyDB1 | SomeCompanyDB1 |
+        | DB Elements Are Equal | select name, surname from employee | \
+        Primary | Replica1 | Replica2 |
         """
 
-        result = self._get_elements_from_two_db(selectStatement,
-                                                firstAliasOrIndex,
-                                                secondAliasOrIndex)
+        aliasesOrIndexes = (firstAliasOrIndex,) + otherAliasesOrIndexes
+        assert len(aliasesOrIndexes) > 1, \
+            "At least two databases should be specified."
+        diffs = self._diff_results(selectStatement, aliasesOrIndexes)
 
-        assert set(result[0]) == set(result[1]), \
-            "Expected to have equal elements but '%s' is not equal to '%s'" \
-            % (result[0], result[1])
-        logger.debug("Results fetched from %s on %s and %s databases are"
-                     " equal." % (selectStatement, firstAliasOrIndex,
-                                  secondAliasOrIndex))
+        messages = [diff.report(selectStatement, firstAliasOrIndex,
+                                aliasOrIndex, self._sampleRowsNumber)
+                    for aliasOrIndex, diff in zip(otherAliasesOrIndexes, diffs)
+                    if not diff.isEmpty]
+        assert not messages, '\n'.join(messages)
+        logger.debug("Results fetched from %s on %s databases are"
+                     " equal." % (selectStatement,
+                                  ', '.join(map(str, aliasesOrIndexes))))
 
     def db_elements_are_not_equal(self, selectStatement, firstAliasOrIndex,
                                   secondAliasOrIndex):
         """
         Checks that fetched results of performed query on two
         databases are not equal.
+        Results are compared in the same way as in `DB Elements Are Equal`.
         If DB elements will be equal, then this will
         throw an AssertionError.
 
@@ -162,41 +1028,112 @@ class _ExecutionKeywords(_CommonActions):
         SomeCompanyDB1 | SomeCompanyDB1 |
         """
 
-        result = self._get_elements_from_two_db(selectStatement,
-                                                firstAliasOrIndex,
-                                                secondAliasOrIndex)
+        diff = self._diff_results(selectStatement, (firstAliasOrIndex,
+                                                    secondAliasOrIndex))[0]
 
-        assert set(result[0]) != set(result[1]), \
-            ("Expected to have not equal elements but they equal. "
-             "Query result:'%s'" % (result[0]))
+        assert not diff.isEmpty, \
+            ("Expected to have not equal elements from '%s' on %s and %s "
+             "databases but they equal." % (selectStatement,
+                                            firstAliasOrIndex,
+                                            secondAliasOrIndex))
         logger.debug("Results fetched from %s on %s and %s databases are"
                      " not equal." % (selectStatement, firstAliasOrIndex,
                                       secondAliasOrIndex))
 
-    def _get_elements_from_two_db(self, selectStatement, firstAliasOrIndex,
-                                  secondAliasOrIndex):
+    def get_query_statistics(self, top=10):
+        """
+        Logs slow-query report and returns statistics of statements that
+        took the most time since library import or the last
+        `Reset Query Statistics`.
+        Time of statement includes its execution, fetching of rows and
+        commit. Statistics are collected only if library is imported with
+        queryStatistics argument.
+
+        *Arguments:*
+            - top: int, number of statements.
+
+        *Return:*
+            - list of dicts with statement, keyword, alias, calls, total, \
+            p50, p95, rows and bytes keys, times are in seconds.
+
+        *Examples:*
+        | @{statistics} | Get Query Statistics | 20 |
+        """
+
+        assert self._queryStatistics is not None, \
+            "Query statistics are not collected, import library with " \
+            "queryStatistics=True."
+
+        top = int(top)
+        logger.info(self._queryStatistics.report(top))
+
+        return self._queryStatistics.top(top)
+
+    def reset_query_statistics(self):
+        """
+        Removes collected query statistics.
+
+        *Arguments:*
+            - None
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | Reset Query Statistics |
         """
-        Gets fetched results of performed query on two databases.
+
+        if self._queryStatistics is not None:
+            self._queryStatistics.reset()
+
+    def _diff_results(self, selectStatement, aliasesOrIndexes):
+        """
+        Compares results of query performed on several databases with the
+        result from the first one.
+        Databases are queried at the same time and results are compared
+        batch by batch.
 
         *Arguments:*
             - selectStatement: string, sql select statement.
-            - firstAliasOrIndex: string or int, alias or index of \
-            first database.
-            - secondAliasOrIndex: string or int, alias or index of \
-            second database.
+            - aliasesOrIndexes: list, aliases or indexes of databases.
 
         *Return:*
-            - tuple of two results.
+            - list of _ResultsDiff objects for all databases except first one.
         """
 
-        currentDbIndex = self._connectionCache.current_index
+        connections = [self._get_connection(aliasOrIndex)
+                       for aliasOrIndex in aliasesOrIndexes]
+
+        # The same connection could be referenced both by alias and index,
+        # but it can not be used by two threads at once.
+        uniqueConnections = []
+        for connection in connections:
+            if connection not in uniqueConnections:
+                uniqueConnections.append(connection)
+        positions = [uniqueConnections.index(c) for c in connections]
+
+        pool = ThreadPool(len(uniqueConnections))
+        streams = []
+        try:
+            streams = [self._stream_rows(selectStatement,
+                                         connection=connection)
+                       for connection in uniqueConnections]
+
+            diffs = [_ResultsDiff() for position in positions[1:]]
+            while True:
+                batches = pool.map(lambda stream: next(stream, None), streams)
+                if not any(batches):
+                    break
 
-        self.set_current_database(firstAliasOrIndex)
-        firstResult = self.query(selectStatement)
+                for diff, position in zip(diffs, positions[1:]):
+                    diff.add_expected(batches[positions[0]] or [])
+                    diff.add_actual(batches[position] or [])
 
-        self.set_current_database(secondAliasOrIndex)
-        secondResult = self.query(selectStatement)
+        finally:
+            for stream in streams:
+                stream.close()
+            pool.close()
+            pool.join()
 
-        self.set_current_database(currentDbIndex)  # Back to initial database.
+        return diffs
 
-        return firstResult, secondResult
@@ -38,11 +38,11 @@ class _ExistenceKeywords(_CommonActions):
         | Check If Exists In Database | select id from employee where \
         first_name = 'Max' and last_name = 'Beloborodko' |
         """
-        queryResults = self.query(selectStatement)
+        queryResults = self._probe_rows(selectStatement, 1)
         assert queryResults, ("Expected to have at least one row from '%s' "
                         "but got 0 rows." % selectStatement)
-        logger.debug("Got row(s): %s \n from '%s' query." % (queryResults,
-                                                             selectStatement))
+        self._debug("Got row: %s \n from '%s' query.", queryResults[0],
+                    selectStatement)
 
     def check_if_not_exists_in_database(self, selectStatement):
         """
@@ -62,8 +62,10 @@ class _ExistenceKeywords(_CommonActions):
         first_name = 'Osama' and last_name = 'bin Laden' |
         """
 
-        queryResults = self.query(selectStatement)
+        queryResults = self._probe_rows(selectStatement,
+                                        self._sampleRowsNumber)
         assert not queryResults, \
             ("Expected to have no rows from '%s' "
-                "but got some rows : %s." % (selectStatement, queryResults))
+                "but got some rows, first of them: %s." %
+                (selectStatement, self._rows(queryResults)))
         logger.debug("Got 0 rows from '%s' query." % selectStatement)
@@ -0,0 +1,79 @@
+#    Copyright (c) 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+class NamedRow(tuple):
+    """
+    Row of query result with access to values by column name as key or
+    attribute, names are case-insensitive. Row is a plain tuple without
+    instance dict, column names are kept once in the row class shared by
+    all rows of result.
+    Attributes of tuple take precedence, so columns named count or index
+    are accessed only by key, e.g. row['count'].
+    """
+
+    __slots__ = ()
+    _columnNames = ()
+    _indexes = {}
+
+    def _index(self, name):
+        try:
+            return self._indexes[name.lower()]
+        except KeyError:
+            raise KeyError("Column '%s' does not exist, columns are: %s." %
+                           (name, ', '.join(self._columnNames)))
+
+    def __getitem__(self, key):
+        if isinstance(key, basestring):
+            key = self._index(key)
+
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._index(name))
+        except KeyError as e:
+            raise AttributeError(e.args[0])
+
+    def __repr__(self):
+        return repr(tuple(self))
+
+    def _asdict(self):
+        """
+        Gets dict of column names and values.
+        """
+
+        return dict(zip(self._columnNames, self))
+
+
+def row_class(description):
+    """
+    Builds class of rows of query result.
+
+    *Arguments:*
+        - description: list, cursor description.
+
+    *Return:*
+        - subclass of NamedRow, if there are several columns with the same \
+        name, then the first of them is accessed by name.
+    """
+
+    columnNames = tuple(column[0] for column in description)
+    indexes = {}
+    for index, name in enumerate(columnNames):
+        indexes.setdefault(name.lower(), index)
+
+    return type('NamedRow', (NamedRow,), {'__slots__': (),
+                                          '_columnNames': columnNames,
+                                          '_indexes': indexes})
@@ -12,8 +12,22 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import csv
+import operator
+import re
+import time
+from itertools import islice
 from robot.api import logger
 from _common import _CommonActions
+from ..utils import _to_bool
+
+
+# Expected count of row counts check, e.g. '5', '>0' or '<= 10'.
+_EXPECTED_COUNT_PATTERN = re.compile(
+    r'^\s*(==|=|!=|<>|>=|<=|>|<)?\s*(\d+)\s*$')
+_OPERATORS = {'=': operator.eq, '==': operator.eq, '!=': operator.ne,
+              '<>': operator.ne, '>': operator.gt, '<': operator.lt,
+              '>=': operator.ge, '<=': operator.le}
 
 
 class _RowsKeywords(_CommonActions):
@@ -21,12 +35,13 @@ class _RowsKeywords(_CommonActions):
     Class that handles all keywords from group 'Rows'.
     """
 
-    def rows_count(self, selectStatement):
+    def rows_count(self, selectStatement, parameters=None):
         """
         Returns the number of rows fetched using 'selectStatement'.
 
         *Arguments:*
-            - selectStatement: string, SQL query.
+            - selectStatement: string, SQL query;
+            - parameters: list, bind parameters of SQL query.
 
         *Return:*
             - int, rows count.
@@ -34,8 +49,7 @@ class _RowsKeywords(_CommonActions):
         *Examples:*
         | ${rows_count} | Rows Count | select * from TableName |
         """
-        cur = self._execute_sql(selectStatement)
-        return cur.rowcount
+        return self._count_rows(selectStatement, parameters=parameters)
 
     def rows_count_is_0(self, selectStatement):
         """
@@ -53,9 +67,12 @@ class _RowsKeywords(_CommonActions):
         *Examples:*
         | Rows Count Is 0 | select * from TableName where name = 'Peter' |
         """
-        count = self.rows_count(selectStatement)
-        assert not count, ("Expected to have 0 rows from '%s', "
-                           "but got %s rows." % (selectStatement, count))
+        if self._count_rows(selectStatement, 1):
+            # Rows are counted fully only for failure message.
+            raise AssertionError("Expected to have 0 rows from '%s', but got "
+                                 "%s rows." % (selectStatement,
+                                               self._count_rows(
+                                                   selectStatement)))
         logger.debug("Got 0 rows from %s." % selectStatement)
 
     def row_count_is_equal_to_x(self, selectStatement, numRows):
@@ -75,6 +92,7 @@ class _RowsKeywords(_CommonActions):
         *Examples:*
         | Row Count Is Equal To X | select * from TableName | 125 |
         """
+        numRows = int(numRows)
         count = self.rows_count(selectStatement)
         assert count == numRows, ("Expected to have %s rows from '%s', but "
                                   "got %s rows." % (numRows, selectStatement,
@@ -98,12 +116,14 @@ class _RowsKeywords(_CommonActions):
         *Examples:*
         | Row Count Is Greater Than X | select * from TableName | 125 |
         """
-        count = self.rows_count(selectStatement)
+        numRows = int(numRows)
+        count = self._count_rows(selectStatement, numRows + 1)
         assert count > numRows, ("Expected to have greater than %s rows from "
                                  "'%s', but got %s rows." % (numRows,
                                                              selectStatement,
                                                              count))
-        logger.debug("Got %s rows from %s." % (numRows, selectStatement))
+        logger.debug("Got more than %s rows from %s." % (numRows,
+                                                         selectStatement))
 
     def row_count_is_less_than_x(self, selectStatement, numRows):
         """
@@ -122,36 +142,237 @@ class _RowsKeywords(_CommonActions):
         *Examples:*
         | Row Count Is Less Than X | select * from TableName | 125 |
         """
-        count = self.rows_count(selectStatement)
+        numRows = int(numRows)
+        count = self._count_rows(selectStatement, numRows)
         assert count < numRows, ("Expected to have less than %s rows from "
-                                 "'%s', but got %s rows." % (numRows,
-                                                             selectStatement,
-                                                             count))
-        logger.debug("Got %s rows from %s." % (numRows, selectStatement))
+                                 "'%s', but got at least %s rows." %
+                                 (numRows, selectStatement, count))
+        logger.debug("Got %s rows from %s." % (count, selectStatement))
 
-    def delete_all_rows_from_table(self, tableName):
+    def delete_all_rows_from_table(self, tableNames, useTruncate=False,
+                                   restartIdentity=False, cascade=False):
         """
-        Deletes everything from the table with given name.
+        Deletes everything from the tables with given names.
+        All tables are cleared in one transaction. Rows are deleted table \
+        by table, tables that reference other specified tables by foreign \
+        keys are cleared first. With useTruncate argument tables are \
+        cleared with TRUNCATE where driver supports it, if TRUNCATE fails \
+        outside of transaction block, then rows are deleted.
+
+        *Note:* TRUNCATE is used with 'psycopg2' driver and with 'MySQLdb' \
+        and 'pymysql' drivers outside of transaction block and without \
+        cascade. TRUNCATE does not fire DELETE triggers and requires \
+        TRUNCATE privilege. PostgreSQL does not truncate tables referenced \
+        by foreign keys of not truncated tables without cascade, MySQL \
+        does not truncate referenced tables at all and always resets \
+        auto-increment counters.
 
         *Arguments:*
-            - tableName: string, table name.
+            - tableNames: list or string divided by comma, table names;
+            - useTruncate: bool, if True - tables are cleared with TRUNCATE;
+            - restartIdentity: bool, if True - identity columns are reset, \
+            used only with TRUNCATE;
+            - cascade: bool, if True - tables that reference specified \
+            tables are cleared too, used only with TRUNCATE.
 
         *Return:*
             - None.
 
         *Examples:*
         | Delete All Rows From Table | TableName |
+        | Delete All Rows From Table | employee, department \
+        | useTruncate=True | restartIdentity=True |
+        """
+        if not isinstance(tableNames, list):
+            tableNames = [t.strip() for t in tableNames.split(',')]
+
+        current = self._connectionCache.current
+        dialect = current.dialect
+        statements = None
+        if _to_bool(useTruncate) and (not current.transactionBlock or
+                                      dialect.transactionalTruncate):
+            statements = dialect.truncate(tableNames,
+                                          _to_bool(restartIdentity),
+                                          _to_bool(cascade))
+        if statements is not None:
+            try:
+                self._clear_tables(current, statements)
+            except Exception as e:
+                # Failed statement aborts the whole transaction block.
+                if current.transactionBlock:
+                    raise
+                logger.info("Tables could not be truncated, rows will be "
+                            "deleted: %s" % e)
+                statements = None
+        if statements is None:
+            self._clear_tables(current,
+                               ["delete from %s" % tableName for tableName
+                                in self._referencing_first(current,
+                                                           tableNames)])
+
+        logger.info("All rows are deleted from table(s) '%s'." %
+                    "', '".join(tableNames))
+
+    def _clear_tables(self, connection, statements):
+        """
+        Executes statements that clear tables and commits them unless
+        transaction block is open.
+
+        *Arguments:*
+            - connection: object, library connection;
+            - statements: list, sql statements.
+
+        *Return:*
+            - None
+        """
+        committed = False
+        try:
+            self._begin_transaction(connection)
+            self._execute_batch(connection, statements)
+            if not connection.transactionBlock:
+                connection.connection.commit()
+                committed = True
+        finally:
+            self._end_transaction(connection, '; '.join(statements),
+                                  committed)
+
+    def _referencing_first(self, connection, tableNames):
+        """
+        Orders tables so every table goes before tables it references by
+        foreign keys. Tables with cyclic references keep specified order.
+
+        *Arguments:*
+            - connection: object, library connection;
+            - tableNames: list, table names.
+
+        *Return:*
+            - list, ordered table names.
+        """
+        if len(tableNames) < 2:
+            return tableNames
+
+        names = [tableName.lower() for tableName in tableNames]
+        referenced = {}
+        for name in names:
+            tables = self._metadata(
+                connection, ('references', name),
+                lambda: self._catalog(connection,
+                                      connection.dialect.referenced_tables,
+                                      name))
+            referenced[name] = set(t.lower() for t in tables
+                                   if t.lower() in names and t.lower() != name)
+
+        ordered = []
+        remaining = list(names)
+        while remaining:
+            # Table could be deleted when no remaining table references it.
+            ready = [name for name in remaining
+                     if not any(name in referenced[other]
+                                for other in remaining)] or remaining[:1]
+            ordered.extend(ready)
+            remaining = [name for name in remaining if name not in ready]
+
+        return [tableNames[names.index(name)] for name in ordered]
+
+    def bulk_insert_rows(self, tableName, rows, columns=None, batchSize=None):
+        """
+        Inserts many rows into the table with given name.
+        Rows are sent in batches with 'COPY FROM STDIN' for 'psycopg2' \
+        driver and with 'executemany' for other drivers, transaction is \
+        committed once per batch unless transaction block is open.
+
+        *Arguments:*
+            - tableName: string, table name;
+            - rows: list of rows or string, path to CSV file, empty CSV \
+            values are inserted as NULL;
+            - columns: list or string divided by comma, names of inserted \
+            columns, first line of CSV file is used for CSV file and all \
+            columns of table are used for list of rows if not specified;
+            - batchSize: int, number of rows in batch, library default is \
+            used if not specified.
+
+        *Return:*
+            - int, number of inserted rows.
+
+        *Examples:*
+        | Bulk Insert Rows | employee | ${rows} | name,surname |
+        | Bulk Insert Rows | employee | ${CURDIR}/employee.csv \
+        | batchSize=10000 |
+        """
+        batchSize = int(batchSize or self._batchSize)
+        if isinstance(columns, basestring):
+            columns = [c.strip() for c in columns.split(',')]
+
+        csvFile = None
+        if isinstance(rows, basestring):
+            csvFile = open(rows, 'rb')
+            rows = (tuple(value or None for value in row)
+                    for row in csv.reader(csvFile))
+            if columns is None:
+                columns = [c.strip() for c in next(rows, ())]
+
+        rows = iter(rows)
+        current = self._connectionCache.current
+        rowsNumber = 0
+        try:
+            while True:
+                batch = [tuple(row) for row in islice(rows, batchSize)]
+                if not batch:
+                    break
+                self._insert_batch(current, tableName, columns or [], batch)
+                rowsNumber += len(batch)
+                self._debug("%s rows are inserted into table '%s'.",
+                            rowsNumber, tableName)
+        finally:
+            if csvFile is not None:
+                csvFile.close()
+
+        logger.info("%s rows are inserted into table '%s'." % (rowsNumber,
+                                                              tableName))
+        return rowsNumber
+
+    def _insert_batch(self, connection, tableName, columns, rows):
+        """
+        Inserts one batch of rows and commits it if transaction block is not
+        open.
+
+        *Arguments:*
+            - connection: object, library connection;
+            - tableName: string, table name;
+            - columns: list, names of inserted columns;
+            - rows: list, rows of values.
+
+        *Return:*
+            - None.
         """
-        self._execute_sql("delete from %s" % tableName, True)
-        logger.info("All rows are deleted from table '%s'." % tableName)
+        statement = "bulk insert into %s" % tableName
+        committed = False
+        self._invalidate_results(connection)
+        try:
+            start = time.time()
+            self._begin_transaction(connection)
+            connection.dialect.insert_rows(connection.cursor(), tableName,
+                                           columns, rows)
+            if not connection.transactionBlock:
+                connection.connection.commit()
+                committed = True
+            if self._queryStatistics is not None:
+                self._queryStatistics.add_execute(statement, connection.alias,
+                                                  time.time() - start)
+        finally:
+            self._end_transaction(connection, statement, committed)
 
     def check_content_for_row_identified_by_rownum(self, colNames,
                                                    expectedValues, tableName,
-                                                   rowNumValue):
+                                                   rowNumValue, orderBy=None):
         """
         Fetches given columns from the table with given name.
         Verifies that received content in the row with number rowNumValue
         equal to the given expected values.
+        Rows are numbered in the order given by orderBy or in the order
+        database returns them if it is not specified. Rows are fetched in
+        batches until the requested one, with orderBy only the requested
+        row is fetched where driver supports it.
         If expected content will be not equal to actual, \
         then this will throw an AssertionError.
 
@@ -159,7 +380,8 @@ class _RowsKeywords(_CommonActions):
             - colNames: list, column names to be retrieved from DB;
             - expectedValues: list, expected fields values;
             - tableName: string, table name;
-            - rowNumValue: int, number of row to be checked.
+            - rowNumValue: int, number of row to be checked;
+            - orderBy: string, order-by clause.
 
         *Return:*
             - None.
@@ -167,16 +389,25 @@ class _RowsKeywords(_CommonActions):
         *Examples:*
         | Check Content For Row Identified By Rownum | name,surname | 'John', \
         'Doe', | TableName | 50 |
+        | Check Content For Row Identified By Rownum | name,surname | 'John', \
+        'Doe', | TableName | 50 | id |
         """
         assert len(colNames) == len(expectedValues),\
             "'colNames' and 'expectedValues' should have the same length."
 
+        rowNumValue = int(rowNumValue)
+        assert rowNumValue > 0, \
+            "Row number should be positive but got %s." % rowNumValue
+
         selectStatement = "select %s from %s" % (",".join(colNames), tableName)
-        res = self.query(selectStatement)
+        if orderBy:
+            selectStatement += " order by %s" % orderBy
+        actualValues = self._fetch_row(selectStatement, rowNumValue,
+                                       bool(orderBy))
 
-        assert len(res) >= rowNumValue, ("Row %s does not exist for statement "
-                                         "%s" % (rowNumValue, selectStatement))
-        actualValues = res[rowNumValue - 1]
+        assert actualValues is not None, ("Row %s does not exist for "
+                                          "statement %s" % (rowNumValue,
+                                                            selectStatement))
 
         result = []
         for i, col in enumerate(colNames):
@@ -190,9 +421,44 @@ class _RowsKeywords(_CommonActions):
         logger.debug("Content for row %s equals to the expected values %s." %
                      (rowNumValue, expectedValues))
 
+    def _fetch_row(self, selectStatement, rowNumValue, ordered):
+        """
+        Fetches only the row with given number from select statement.
+        Row of ordered statement is selected with OFFSET on the database
+        side if dialect supports it, otherwise rows are streamed until the
+        requested one, so order of unordered statement is kept.
+
+        *Arguments:*
+            - selectStatement: string, sql select statement;
+            - rowNumValue: int, number of row starting from 1;
+            - ordered: bool, True if statement has order-by clause.
+
+        *Return:*
+            - Fetched row or None if there are less rows.
+        """
+        dialect = self._connectionCache.current.dialect
+        if ordered and dialect.supportsLimit:
+            rows = self.query(dialect.limit(selectStatement, 1,
+                                            rowNumValue - 1))
+            return rows[0] if rows else None
+
+        skipped = 0
+        stream = self._stream_rows(selectStatement,
+                                   min(self._batchSize, rowNumValue))
+        try:
+            for rows in stream:
+                if skipped + len(rows) >= rowNumValue:
+                    return rows[rowNumValue - skipped - 1]
+                skipped += len(rows)
+        finally:
+            stream.close()
+
+        return None
+
     def check_content_for_row_identified_by_where_clause(self, colNames,
                                                          expectedValues,
-                                                         tableName, where):
+                                                         tableName, where,
+                                                         parameters=None):
         """
         Fetches given columns from the 'tableName' table using where-clause.
         Where-clause should uniquely identify only one row.
@@ -205,7 +471,9 @@ class _RowsKeywords(_CommonActions):
             - colNames: list, column names to be retrieved from DB;
             - expectedValues: list, expected fields values;
             - tableName: string, table name;
-            - where: string, where-clause.
+            - where: string, where-clause;
+            - parameters: list, bind parameters for placeholders of \
+            where-clause in the driver paramstyle.
 
         *Return:*
             - None.
@@ -213,13 +481,15 @@ class _RowsKeywords(_CommonActions):
         *Examples:*
         | Check Content For Row Identified By Where Clause | id,surname | 50, \
         'Doe', | TableName | name = 'John' |
+        | Check Content For Row Identified By Where Clause | id,surname | 50, \
+        'Doe', | TableName | name = %s | ${parameters} |
         """
         assert len(colNames) == len(expectedValues),\
             "'colNames' and 'expectedValues' should have the same length."
 
         actualValues = \
             self.read_single_value_from_table(tableName, ",".join(colNames),
-                                              where)
+                                              where, parameters)
         result = []
         for i, col in enumerate(colNames):
             if expectedValues[i] != actualValues[i]:
@@ -233,7 +503,7 @@ class _RowsKeywords(_CommonActions):
                      (where, expectedValues))
 
     def verify_number_of_rows_matching_where(self, tableName, where,
-                                             rowNumValue):
+                                             rowNumValue, parameters=None):
         """
         Fetches rows using given where-clause from the table with given
         'tableName'.
@@ -245,16 +515,21 @@ class _RowsKeywords(_CommonActions):
         *Arguments:*
             - tableName: string, table name;
             - where: string, where-clause;
-            - rowNumValue: int, expected number of rows.
+            - rowNumValue: int, expected number of rows;
+            - parameters: list, bind parameters for placeholders of \
+            where-clause in the driver paramstyle.
 
         *Return:*
             - None.
 
         *Examples:*
         | Verify Number Of Rows Matching Where | TableName | name='John' | 12 |
+        | Verify Number Of Rows Matching Where | TableName | name=%s | 12 \
+        | ${parameters} |
         """
         selectStatement = "select * from %s where %s" % (tableName, where)
-        count = self.rows_count(selectStatement)
+        rowNumValue = int(rowNumValue)
+        count = self.rows_count(selectStatement, parameters)
 
         assert count == rowNumValue, ("Expected to get %s row(s) for where-"
                                       "clause statement '%s', but got %s." %
@@ -262,6 +537,77 @@ class _RowsKeywords(_CommonActions):
         logger.debug("Number of rows matching 'where %s' statement equals to"
                      "%s." % (where, rowNumValue))
 
+    def verify_row_counts(self, *checks):
+        """
+        Verifies numbers of rows matching where-clauses in several tables
+        with one query.
+        All checks are compiled into one statement of scalar subqueries, so
+        any number of checks costs one round trip. Rows are counted only up
+        to the first row above expected number where dialect supports it.
+        If some numbers of rows do not match, then this will throw an
+        AssertionError with all mismatches.
+
+        *Arguments:*
+            - checks: lists of table name, where-clause and expected \
+            number of rows, or one list of such lists. Where-clause could \
+            be empty to count all rows. Expected number could be prefixed \
+            with comparison operator, e.g. '>0' checks that row exists.
+
+        *Return:*
+            - None.
+
+        *Examples:*
+        | @{first} | Create List | employee | name='John' | 1 |
+        | @{second} | Create List | department | ${EMPTY} | >0 |
+        | @{third} | Create List | fired_employee | ${EMPTY} | 0 |
+        | Verify Row Counts | ${first} | ${second} | ${third} |
+        """
+        assert checks and all(checks), \
+            "At least one check should be specified."
+        if len(checks) == 1 and isinstance(checks[0][0], (list, tuple)):
+            checks = checks[0]
+        for check in checks:
+            assert len(check) == 3, \
+                ("Check %s should consist of table name, where-clause and "
+                 "expected number of rows." % list(check))
+
+        dialect = self._connectionCache.current.dialect
+        expressions = []
+        expectations = []
+        for tableName, where, expected in checks:
+            match = _EXPECTED_COUNT_PATTERN.match(str(expected))
+            assert match, "Expected number of rows '%s' is invalid." % expected
+            operatorName = match.group(1) or '='
+            expectedNumber = int(match.group(2))
+
+            selectStatement = "SELECT 1 FROM %s" % tableName
+            if where:
+                selectStatement += " WHERE %s" % where
+            limit = None
+            if dialect.supportsLimit:
+                # Count above expected number does not change the result.
+                limit = expectedNumber + 1
+                selectStatement = dialect.limit(selectStatement, limit)
+            expressions.append('(%s)' % dialect.count(selectStatement))
+            expectations.append((tableName, where, operatorName,
+                                 expectedNumber, limit))
+
+        counts = self._execute_sql(
+            dialect.select_values(expressions)).fetchone()
+
+        failures = []
+        for count, (tableName, where, operatorName, expectedNumber,
+                    limit) in zip(counts, expectations):
+            if not _OPERATORS[operatorName](count, expectedNumber):
+                failures.append(
+                    "Expected to get %s %s row(s) from table %s for where-"
+                    "clause '%s', but got %s%s." %
+                    (operatorName, expectedNumber, tableName, where or '',
+                     'at least ' if count == limit else '', count))
+
+        assert not failures, '\n'.join(failures)
+        logger.debug("Numbers of rows match in %s check(s)." % len(checks))
+
     def row_should_not_exist_in_table(self, tableName, where):
         """
         Verifies that table with given 'tableName' doesn't have rows
@@ -280,11 +626,13 @@ class _RowsKeywords(_CommonActions):
         | Row Should Not Exist In Table | TableName | surname = 'Doe' |
         """
         selectStatement = "select * from %s where %s" % (tableName, where)
-        actualValues = self.query(selectStatement)
+        actualValues = self._probe_rows(selectStatement,
+                                        self._sampleRowsNumber)
 
         assert len(actualValues) == 0, ("Expected to get 0 rows for where-"
-                                        "clause statement '%s', but got %s: "
-                                        "%s." % (where, len(actualValues),
-                                                 actualValues))
+                                        "clause statement '%s', but got at "
+                                        "least %s: %s." %
+                                        (where, len(actualValues),
+                                         self._rows(actualValues)))
         logger .debug("There is no rows matching 'where %s' statement." %
                       where)
@@ -12,8 +12,30 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
+from decimal import Decimal
+from multiprocessing.pool import ThreadPool
 from robot.api import logger
-from _common import _CommonActions
+from _common import _CommonActions, _ResultsDiff
+
+
+def _checksum_value(value):
+    """
+    Converts value into string that does not depend on driver, so equal
+    numbers of different types, e.g. int, long, float and Decimal, and
+    equal strings of str and unicode types are converted into the same
+    string.
+    """
+
+    if isinstance(value, (int, long, float, Decimal)):
+        number = Decimal(repr(value) if isinstance(value, float) else value)
+        if number.is_finite() and number == number.to_integral_value():
+            return str(int(number))
+        return str(number.normalize())
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+
+    return str(value)
 
 
 class _TableKeywords(_CommonActions):
@@ -24,6 +46,8 @@ class _TableKeywords(_CommonActions):
     def table_must_exist(self, tableName):
         """
         Checks that table exists.
+        Names of tables are loaded once and cached, cache is reloaded if
+        table is not found in it.
         If table not exist, then this will throw an AssertionError.
 
         *Arguments:*
@@ -36,11 +60,24 @@ class _TableKeywords(_CommonActions):
         | Table Must Exist | employee |
         """
 
-        selectStatement = ("SELECT * FROM information_schema.tables WHERE "
-                           "table_name='%s'") % tableName
+        current = self._connectionCache.current
+        loaded = []
 
-        rowsCount = self.rows_count(selectStatement)
-        assert rowsCount, 'Table %s does not exist.' % tableName
+        def tables():
+            loaded.append(True)
+            return set(name.lower() for name in
+                       self._catalog(current, current.dialect.table_names))
+
+        exists = tableName.lower() in self._metadata(current, ('tables',),
+                                                     tables)
+        if not exists and not loaded:
+            # Table could be created outside of the library after names
+            # were cached.
+            del current.metadata[('tables',)]
+            exists = tableName.lower() in self._metadata(current,
+                                                         ('tables',), tables)
+
+        assert exists, 'Table %s does not exist.' % tableName
         logger.debug("Table %s exists." % tableName)
 
     def table_must_be_empty(self, tableName):
@@ -60,7 +97,7 @@ class _TableKeywords(_CommonActions):
 
         selectStatement = "SELECT * FROM %s" % tableName
 
-        rowsCount = self.rows_count(selectStatement)
+        rowsCount = self._count_rows(selectStatement, 1)
         assert not rowsCount, 'Table %s is not empty.' % tableName
         logger.debug("Table %s is empty." % tableName)
 
@@ -83,11 +120,12 @@ class _TableKeywords(_CommonActions):
         """
 
         selectStatement = "SELECT * FROM %s" % tableName
+        rowsNumber = int(rowsNumber)
 
-        rowsCount = self.rows_count(selectStatement)
+        rowsCount = self._count_rows(selectStatement, rowsNumber)
         assert rowsCount < rowsNumber,\
-            ('Table %s has %s row(s) but should have less than %s row(s).'
-                % (tableName, rowsCount, rowsNumber))
+            ('Table %s has at least %s row(s) but should have less than %s '
+             'row(s).' % (tableName, rowsCount, rowsNumber))
         logger.debug("Table %s contains %s row(s)." % (tableName, rowsCount))
 
     def table_must_contain_more_than_number_of_rows(self, tableName,
@@ -109,12 +147,14 @@ class _TableKeywords(_CommonActions):
         """
 
         selectStatement = "SELECT * FROM %s" % tableName
+        rowsNumber = int(rowsNumber)
 
-        rowsCount = self.rows_count(selectStatement)
+        rowsCount = self._count_rows(selectStatement, rowsNumber + 1)
         assert rowsCount > rowsNumber,\
             ('Table %s has %s row(s) but should have more than %s row(s).'
                 % (tableName, rowsCount, rowsNumber))
-        logger.debug("Table %s contains %s row(s)." % (tableName, rowsCount))
+        logger.debug("Table %s contains more than %s row(s)." %
+                     (tableName, rowsNumber))
 
     def table_must_contain_number_of_rows(self, tableName, rowsNumber):
         """
@@ -134,6 +174,7 @@ class _TableKeywords(_CommonActions):
         """
 
         selectStatement = "SELECT * FROM %s" % tableName
+        rowsNumber = int(rowsNumber)
 
         rowsCount = self.rows_count(selectStatement)
         assert rowsCount == rowsNumber,\
@@ -145,8 +186,6 @@ class _TableKeywords(_CommonActions):
         """
         Gets primary key columns for specified table.
 
-        *Note:* This method works only with 'psycopg2' driver.
-
         *Arguments:*
             - tableName: string, table name.
 
@@ -157,29 +196,28 @@ class _TableKeywords(_CommonActions):
         | ${key_columns} | Get Primary Key Columns For Table | employee |
         """
 
-        # // TODO: Extend this method to work with other drivers.
+        return self._primary_key_columns(tableName)
 
-        driverName = self._connectionCache.current.driverName
-        assert driverName == 'psycopg2',\
-            "Impossible to use this keyword with '%s' driver." % driverName
+    def _primary_key_columns(self, tableName, connection=None):
+        """
+        Gets primary key columns for specified table.
 
-        selectStatement = """SELECT KU.table_name as tablename,
-        column_name as primarykeycolumn
-        FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS AS TC
-        INNER JOIN
-        INFORMATION_SCHEMA.KEY_COLUMN_USAGE AS KU
-        ON TC.CONSTRAINT_TYPE = 'PRIMARY KEY' AND
-        TC.CONSTRAINT_NAME = KU.CONSTRAINT_NAME
-        and ku.table_name='%s'
-        ORDER BY KU.TABLE_NAME, KU.ORDINAL_POSITION;""" % tableName
+        *Arguments:*
+            - tableName: string, table name.
+            - connection: object, connection to get columns from, current \
+            connection if not specified.
 
-        primaryKeys = self.query(selectStatement)
+        *Return:*
+            - Primary key columns.
+        """
 
-        result = []
-        for table, columnName in primaryKeys:
-            result.append(columnName.lower())
+        connection = connection or self._connectionCache.current
 
-        return result
+        return list(self._metadata(
+            connection, ('primaryKey', tableName),
+            lambda: [column.lower() for column in self._catalog(
+                connection, connection.dialect.primary_key_columns,
+                tableName)]))
 
     def check_primary_key_columns_for_table(self, tableName, columns):
         """
@@ -187,8 +225,6 @@ class _TableKeywords(_CommonActions):
         If table contains less or greater number of rows than specified,
         then this will throw an AssertionError.
 
-        *Note:* This method works only with 'psycopg2' driver.
-
         *Arguments:*
             - tableName: string, table name.
             - columns: list or string divided by comma, table columns.
@@ -212,11 +248,289 @@ class _TableKeywords(_CommonActions):
         logger.debug("Primary key columns %s in table %s match with specified"
                      " %s." % (tableColumns, tableName, columns))
 
+    def table_checksums_must_be_equal(self, tableName, firstAliasOrIndex,
+                                      secondAliasOrIndex, chunkSize=100000,
+                                      keyColumns=None):
+        """
+        Checks that table has equal content in two databases without
+        transferring its rows.
+        Table is split into chunks by ranges of key columns and checksum of
+        every chunk is computed on both servers at the same time. Only rows
+        of chunks with different checksums are fetched to show the
+        difference. Both databases should use the same driver.
+        If table content will not be equal, then this will throw an
+        AssertionError.
+
+        *Note:* Checksums are computed on the server side with 'psycopg2', \
+        'MySQLdb' and 'pymysql' drivers, other drivers fetch chunk rows and \
+        compute checksums on the client side.
+
+        *Arguments:*
+            - tableName: string, table name.
+            - firstAliasOrIndex: string or int, alias or index of \
+            first database.
+            - secondAliasOrIndex: string or int, alias or index of \
+            second database.
+            - chunkSize: int, number of rows in chunk.
+            - keyColumns: list or string divided by comma, columns that \
+            uniquely identify row, primary key columns are used if not \
+            specified.
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | Table Checksums Must Be Equal | employee | Primary | Replica |
+        | Table Checksums Must Be Equal | employee | Primary | Replica \
+        | 10000 | id |
+        """
+
+        chunkSize = int(chunkSize)
+        connections = [self._get_connection(firstAliasOrIndex),
+                       self._get_connection(secondAliasOrIndex)]
+
+        if keyColumns is None:
+            keyColumns = self._primary_key_columns(tableName, connections[0])
+        elif not isinstance(keyColumns, list):
+            keyColumns = [c.strip() for c in keyColumns.split(',')]
+        assert keyColumns, ("Table %s has no primary key, key columns should "
+                            "be specified." % tableName)
+
+        columns = self._table_columns(tableName, connections[0])
+        chunks = self._key_chunks(tableName, keyColumns, chunkSize,
+                                  connections[0])
+
+        def checksums(connection):
+            return [self._chunk_checksum(tableName, columns, keyColumns, chunk,
+                                         connection) for chunk in chunks]
+
+        if connections[0] is connections[1]:
+            results = map(checksums, connections)
+        else:
+            pool = ThreadPool(2)
+            try:
+                results = pool.map(checksums, connections)
+            finally:
+                pool.close()
+                pool.join()
+
+        mismatched = [chunk for chunk, first, second
+                      in zip(chunks, results[0], results[1])
+                      if first != second]
+        messages = [self._chunk_diff(tableName, columns, keyColumns, chunk,
+                                     connections, (firstAliasOrIndex,
+                                                   secondAliasOrIndex))
+                    for chunk in mismatched[:self._sampleRowsNumber]]
+
+        assert not mismatched, \
+            ("Table %s differs in %s of %s chunk(s) on %s and %s "
+             "databases.\n%s" % (tableName, len(mismatched), len(chunks),
+                                 firstAliasOrIndex, secondAliasOrIndex,
+                                 '\n'.join(messages)))
+        logger.debug("Checksums of %s chunk(s) of table %s are equal on %s "
+                     "and %s databases." % (len(chunks), tableName,
+                                        firstAliasOrIndex, secondAliasOrIndex))
+
+    def _table_columns(self, tableName, connection=None):
+        """
+        Gets names of all columns of table, names are cached.
+
+        *Arguments:*
+            - tableName: string, table name.
+            - connection: object, connection to get columns from, current \
+            connection if not specified.
+
+        *Return:*
+            - list of column names.
+        """
+
+        connection = connection or self._connectionCache.current
+
+        def load():
+            cur = self._execute_sql('SELECT * FROM %s WHERE 1=0' % tableName,
+                                    connection=connection)
+            columns = [column[0] for column in cur.description]
+            cur.fetchall()
+            return columns
+
+        return list(self._metadata(connection, ('columns', tableName), load))
+
+    def invalidate_metadata_cache(self, aliasOrIndex=None):
+        """
+        Clears cached schema metadata: names of tables, columns, primary \
+        keys and foreign keys.
+        Cache is cleared automatically when schema is changed with \
+        `Execute Sql` or `Execute Sql Script`, this keyword is needed if \
+        schema is changed outside of the library.
+
+        *Arguments:*
+            - aliasOrIndex: string or int, alias or index of database, \
+            current database if not specified.
+
+        *Return:*
+            - None
+
+        *Examples:*
+        | Invalidate Metadata Cache |
+        """
+
+        self._get_connection(aliasOrIndex).metadata.clear()
+        logger.debug("Metadata cache is cleared.")
+
+    def _key_chunks(self, tableName, keyColumns, chunkSize, connection):
+        """
+        Splits table into ranges of key columns values.
+        Boundaries are every chunkSize-th key found on the database side.
+
+        *Arguments:*
+            - tableName: string, table name.
+            - keyColumns: list, key columns.
+            - chunkSize: int, number of rows in chunk.
+            - connection: object, connection to get boundaries from.
+
+        *Return:*
+            - list of (lower, upper) tuples of key values, None means \
+            unbounded.
+        """
+
+        keys = ', '.join(keyColumns)
+        selectStatement = ("SELECT %s FROM (SELECT %s, ROW_NUMBER() OVER "
+                           "(ORDER BY %s) pydb_rn FROM %s) pydb_keys WHERE "
+                           "%s = 0 ORDER BY %s" %
+                           (keys, keys, keys, tableName,
+                            connection.dialect.modulo('pydb_rn - 1',
+                                                      chunkSize), keys))
+        boundaries = [tuple(row) for row in
+                      self._execute_sql(selectStatement,
+                                        connection=connection).fetchall()][1:]
+
+        return zip([None] + boundaries, boundaries + [None])
+
+    @staticmethod
+    def _chunk_condition(keyColumns, chunk, dialect):
+        """
+        Builds where-clause that selects rows of chunk.
+        Keys are compared as row values, comparison is expanded into simple
+        conditions so it works on every database.
+
+        *Arguments:*
+            - keyColumns: list, key columns.
+            - chunk: tuple, lower and upper key values.
+            - dialect: object, dialect that builds bind placeholders.
+
+        *Return:*
+            - tuple of where-clause and list of bind parameters.
+        """
+
+        conditions = []
+        parameters = []
+        for operator, values in zip(('>=', '<'), chunk):
+            if values is None:
+                continue
+
+            alternatives = []
+            for i in range(len(keyColumns)):
+                last = operator if i == len(keyColumns) - 1 else operator[0]
+                parts = []
+                for j, column in enumerate(keyColumns[:i + 1]):
+                    parameters.append(values[j])
+                    parts.append('%s %s %s' % (
+                        column, last if j == i else '=',
+                        dialect.bind_placeholder(len(parameters))))
+                alternatives.append('(%s)' % ' AND '.join(parts))
+            conditions.append('(%s)' % ' OR '.join(alternatives))
+
+        if not conditions:
+            return '', parameters
+        return ' WHERE %s' % ' AND '.join(conditions), parameters
+
+    def _chunk_checksum(self, tableName, columns, keyColumns, chunk,
+                        connection):
+        """
+        Computes rows number and checksum of chunk.
+
+        *Arguments:*
+            - tableName: string, table name.
+            - columns: list, all columns of table.
+            - keyColumns: list, key columns.
+            - chunk: tuple, lower and upper key values.
+            - connection: object, connection to compute checksum on.
+
+        *Return:*
+            - tuple of rows number and checksum.
+        """
+
+        dialect = connection.dialect
+        where, parameters = self._chunk_condition(keyColumns, chunk,
+                                                  dialect)
+        expression = dialect.checksum(columns, keyColumns)
+
+        if expression is not None:
+            selectStatement = 'SELECT COUNT(*), %s FROM %s%s' % (
+                expression, tableName, where)
+            return tuple(self._execute_sql(selectStatement,
+                                           parameters=parameters or None,
+                                           connection=connection).fetchone())
+
+        selectStatement = 'SELECT %s FROM %s%s ORDER BY %s' % (
+            ', '.join(columns), tableName, where, ', '.join(keyColumns))
+        rowsNumber = 0
+        digest = hashlib.md5()
+        for rows in self._stream_rows(selectStatement, connection=connection,
+                                      parameters=parameters):
+            for row in rows:
+                for value in row:
+                    if value is None:
+                        digest.update('N;')
+                    else:
+                        value = _checksum_value(value)
+                        digest.update('%d:%s;' % (len(value), value))
+            rowsNumber += len(rows)
+
+        return rowsNumber, digest.hexdigest()
+
+    def _chunk_diff(self, tableName, columns, keyColumns, chunk, connections,
+                    aliasesOrIndexes):
+        """
+        Fetches rows of chunk from both databases and describes difference.
+
+        *Arguments:*
+            - tableName: string, table name.
+            - columns: list, all columns of table.
+            - keyColumns: list, key columns.
+            - chunk: tuple, lower and upper key values.
+            - connections: list, two connections.
+            - aliasesOrIndexes: list, aliases or indexes of databases.
+
+        *Return:*
+            - string, difference description.
+        """
+
+        keys = set(column.lower() for column in keyColumns)
+        selectedColumns = keyColumns + [column for column in columns
+                                        if column.lower() not in keys]
+        diff = _ResultsDiff(len(keyColumns))
+        for connection, add in zip(connections, (diff.add_expected,
+                                                 diff.add_actual)):
+            where, parameters = self._chunk_condition(
+                keyColumns, chunk, connection.dialect)
+            selectStatement = 'SELECT %s FROM %s%s ORDER BY %s' % (
+                ', '.join(selectedColumns), tableName, where,
+                ', '.join(keyColumns))
+            for rows in self._stream_rows(selectStatement,
+                                          connection=connection,
+                                          parameters=parameters):
+                add(rows)
+
+        return diff.report(selectStatement, aliasesOrIndexes[0],
+                           aliasesOrIndexes[1], self._sampleRowsNumber)
+
     def get_transaction_isolation_level(self):
         """
         Gets transaction isolation level.
 
-        *Note:* This method works only with 'psycopg2' driver.
+        *Note:* This method works with 'psycopg2', 'MySQLdb', 'pymysql' and \
+        'sqlite3' drivers.
 
         *Arguments:*
             - None
@@ -231,15 +545,13 @@ class _TableKeywords(_CommonActions):
         | ${isolation_level} | Get Transaction Isolation Level |
         """
 
-        # // TODO: Extend this method to work with other drivers.
-        driverName = self._connectionCache.current.driverName
-        assert driverName == 'psycopg2',\
-            "Impossible to use this keyword with '%s' driver." % driverName
-
-        selectStatement = "SELECT CURRENT_SETTING('transaction_isolation');"
+        current = self._connectionCache.current
+        level = self._catalog(current, current.dialect.isolation_level)
+        assert level is not None, \
+            "Impossible to use this keyword with '%s' driver." % \
+            current.driverName
 
-        result = 'TRANSACTION_%s' % \
-                 self.query(selectStatement)[0][0].replace(' ', '_').upper()
+        result = 'TRANSACTION_%s' % level.replace(' ', '_').upper()
         logger.debug("Transaction isolation level is %s." % result)
 
         return result
@@ -250,7 +562,8 @@ class _TableKeywords(_CommonActions):
         If transaction isolation level is not equal to specified, then this \
         will throw an AssertionError.
 
-        *Note:* This method works only with 'psycopg2' driver.
+        *Note:* This method works with 'psycopg2', 'MySQLdb', 'pymysql' and \
+        'sqlite3' drivers.
 
         *Arguments:*
             - transactionLevel: string, transaction isolation level.
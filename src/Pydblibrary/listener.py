@@ -0,0 +1,38 @@
+#    Copyright (c) 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+class LibraryListener(object):
+    """
+    Library listener that resets library caches between tests and
+    closes pooled connections when library is closed.
+    Log level is checked once per suite and test instead of every sql
+    statement, so level changed inside test is taken into account from
+    the next test.
+    """
+
+    ROBOT_LISTENER_API_VERSION = 2
+
+    def __init__(self, library):
+        self._library = library
+
+    def start_suite(self, name, attrs):
+        self._library._debugLogged = None
+
+    def start_test(self, name, attrs):
+        self._library._debugLogged = None
+
+    def close(self):
+        if self._library._connectionPool is not None:
+            self._library._connectionPool.drain()
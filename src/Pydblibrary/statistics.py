@@ -0,0 +1,241 @@
+#    Copyright (c) 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+
+def _rows_bytes(rows):
+    """
+    Estimates size of fetched rows, strings are counted by length and other
+    values as 8 bytes.
+    """
+
+    size = 0
+    for row in rows:
+        for value in row:
+            size += len(value) if isinstance(value, basestring) else 8
+
+    return size
+
+
+def _percentile(sortedValues, percent):
+    """
+    Gets percentile of sorted values using nearest-rank method.
+    """
+
+    index = max(int(round(percent / 100.0 * len(sortedValues))) - 1, 0)
+    return sortedValues[index]
+
+
+class _Execution(object):
+    """
+    One execution of statement, time of fetches and commit made by its
+    cursor is added to it.
+    """
+
+    def __init__(self, statementStatistics, seconds):
+        self.statementStatistics = statementStatistics
+        self.seconds = seconds
+
+    def add_fetch(self, seconds, rows):
+        """
+        Adds fetch or commit time and fetched rows to execution.
+        """
+
+        self.seconds += seconds
+        self.statementStatistics.rows += len(rows)
+        self.statementStatistics.bytes += _rows_bytes(rows)
+
+
+class _StatementStatistics(object):
+    """
+    Timings of one statement executed by one keyword on one database.
+    """
+
+    def __init__(self, statement, keyword, alias):
+        self.statement = statement
+        self.keyword = keyword
+        self.alias = alias
+        self.executions = []
+        self.rows = 0
+        self.bytes = 0
+
+    def as_dict(self):
+        durations = sorted(e.seconds for e in self.executions)
+        return {'statement': self.statement,
+                'keyword': self.keyword,
+                'alias': self.alias,
+                'calls': len(durations),
+                'total': sum(durations),
+                'p50': _percentile(durations, 50),
+                'p95': _percentile(durations, 95),
+                'rows': self.rows,
+                'bytes': self.bytes}
+
+
+class _TimedCursor(object):
+    """
+    Cursor wrapper that records time and size of fetched rows.
+    """
+
+    def __init__(self, cursor, execution):
+        self._cursor = cursor
+        self._execution = execution
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def _fetch(self, method, *args):
+        start = time.time()
+        rows = method(*args)
+        self._execution.add_fetch(time.time() - start, rows)
+        return rows
+
+    def fetchone(self):
+        start = time.time()
+        row = self._cursor.fetchone()
+        self._execution.add_fetch(time.time() - start,
+                                  [] if row is None else [row])
+        return row
+
+    def fetchmany(self, size):
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+
+class QueryStatistics(object):
+    """
+    Collects timings of sql statements per keyword and per connection alias
+    and builds slow-query report.
+    It is also a library listener that tracks running keyword and writes
+    report to file when library is closed at the end of the run.
+    """
+
+    ROBOT_LISTENER_API_VERSION = 2
+
+    def __init__(self, reportFile=None):
+        self._reportFile = reportFile
+        self._statements = {}
+        self._keywords = []
+
+    def close(self):
+        if self._reportFile:
+            with open(self._reportFile, 'w') as reportFile:
+                reportFile.write(self.report())
+
+    def start_keyword(self, name, attrs):
+        self._keywords.append(name)
+
+    def end_keyword(self, name, attrs):
+        if self._keywords:
+            self._keywords.pop()
+
+    def add_execute(self, statement, alias, seconds):
+        """
+        Records execution of statement.
+
+        *Arguments:*
+            - statement: string, sql statement.
+            - alias: string or int, alias or index of database.
+            - seconds: float, execution time.
+
+        *Return:*
+            - Execution of statement, following fetches and commit are \
+            added to it with add_fetch method.
+        """
+
+        keyword = self._keywords[-1] if self._keywords else None
+        key = (statement, keyword, alias)
+        # setdefault is atomic, so statements could be recorded by threads.
+        statementStatistics = self._statements.setdefault(
+            key, _StatementStatistics(statement, keyword, alias))
+        execution = _Execution(statementStatistics, seconds)
+        statementStatistics.executions.append(execution)
+
+        return execution
+
+    @staticmethod
+    def timed_cursor(cursor, execution):
+        """
+        Wraps cursor so its fetches are added to execution of statement.
+        """
+
+        return _TimedCursor(cursor, execution)
+
+    def reset(self):
+        """
+        Removes all collected statistics.
+        """
+
+        self._statements = {}
+
+    def top(self, number):
+        """
+        Gets statistics of statements that took the most time.
+
+        *Arguments:*
+            - number: int, number of statements.
+
+        *Return:*
+            - list of dicts with statement, keyword, alias, calls, total, \
+            p50, p95, rows and bytes keys.
+        """
+
+        statistics = [s.as_dict() for s in self._statements.values()]
+        statistics.sort(key=lambda s: s['total'], reverse=True)
+
+        return statistics[:number]
+
+    def report(self, number=10):
+        """
+        Builds text report with the slowest statements and totals per keyword
+        and per connection alias.
+
+        *Arguments:*
+            - number: int, number of statements in report.
+
+        *Return:*
+            - string, report.
+        """
+
+        statistics = self.top(len(self._statements))
+        lines = ['Query statistics: %s statement(s), %s call(s), %.3f s.' %
+                 (len(statistics), sum(s['calls'] for s in statistics),
+                  sum(s['total'] for s in statistics)),
+                 'Slowest statements:']
+        for s in statistics[:number]:
+            lines.append('  %.3f s, %s call(s), p50 %.3f s, p95 %.3f s, '
+                         '%s row(s), %s byte(s), keyword %s, alias %s: %s' %
+                         (s['total'], s['calls'], s['p50'], s['p95'],
+                          s['rows'], s['bytes'], s['keyword'], s['alias'],
+                          ' '.join(s['statement'].split())))
+
+        for title, field in (('By keyword:', 'keyword'),
+                             ('By alias:', 'alias')):
+            totals = {}
+            for s in statistics:
+                calls, total = totals.get(s[field], (0, 0.0))
+                totals[s[field]] = (calls + s['calls'], total + s['total'])
+            lines.append(title)
+            for name, (calls, total) in sorted(totals.items(),
+                                               key=lambda t: -t[1][1]):
+                lines.append('  %.3f s, %s call(s): %s' % (total, calls,
+                                                           name))
+
+        return '\n'.join(lines)
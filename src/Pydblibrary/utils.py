@@ -0,0 +1,24 @@
+#    Copyright (c) 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+def _to_bool(value):
+    """
+    Converts value given from Robot Framework test data to bool.
+    """
+
+    if isinstance(value, basestring):
+        return value.strip().upper() not in ('', 'FALSE', 'NO', 'OFF', '0',
+                                             'NONE')
+    return bool(value)
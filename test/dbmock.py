@@ -13,10 +13,122 @@
 #    under the License.
 
 
+import sqlite3
+
+
+class SqliteDriverMock(object):
+    """
+    Driver that connects to in-memory SQLite database with signature of
+    server database drivers.
+    """
+
+    def connect(self, database, user, password, host, port):
+        return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+class PostgresDriverMock(object):
+    """
+    Driver that emulates transaction status and named cursors of psycopg2
+    over in-memory SQLite database.
+    """
+
+    def connect(self, database, user, password, host, port):
+        return PostgresConnectionMock()
+
+
+class PostgresConnectionMock(object):
+
+    def __init__(self):
+        self.connection = sqlite3.connect(':memory:',
+                                          check_same_thread=False)
+        self.inTransaction = False
+        self.namedCursors = []
+        self.openCursors = 0
+
+    def cursor(self, name=None, withhold=False):
+        if name is None:
+            return PostgresCursorMock(self)
+
+        self.openCursors += 1
+        return NamedCursorMock(self, name, withhold)
+
+    def get_transaction_status(self):
+        return 2 if self.inTransaction else 0
+
+    def _end(self, committed):
+        for cursor in self.namedCursors:
+            if not committed or not cursor.withhold:
+                cursor.dropped = True
+        self.namedCursors = []
+        self.inTransaction = False
+
+    def commit(self):
+        self.connection.commit()
+        self._end(True)
+
+    def rollback(self):
+        self.connection.rollback()
+        self._end(False)
+
+    def close(self):
+        self.connection.close()
+
+
+class PostgresCursorMock(object):
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection.connection.cursor()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, sqlStatement, parameters=()):
+        self._connection.inTransaction = True
+        self._cursor.execute(sqlStatement, parameters)
+
+
+class NamedCursorMock(object):
+    """
+    Server-side cursor, its description is known after the first fetch and
+    it is dropped when transaction that declared it ends.
+    """
+
+    def __init__(self, connection, name, withhold):
+        self._connection = connection
+        self.name = name
+        self.withhold = withhold
+        self.description = None
+        self.dropped = False
+        self._rows = []
+        self._description = None
+
+    def execute(self, sqlStatement, parameters=()):
+        self._connection.inTransaction = True
+        self._connection.namedCursors.append(self)
+        cur = self._connection.connection.execute(sqlStatement, parameters)
+        self._rows = cur.fetchall()
+        self._description = cur.description
+
+    def fetchmany(self, size):
+        if self.dropped:
+            raise Exception('cursor "%s" does not exist' % self.name)
+        self.description = self._description
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        self._connection.openCursors -= 1
+        if not self.dropped:
+            self._connection.inTransaction = True
+
+
 class DBDriverMock(object):
     connection = None
+    connectCalls = 0
 
     def connect(self, database, user, password, host, port):
+        self.connectCalls += 1
         if not self.connection:
             connection = DBConnectionMock()
             self.connection = connection
@@ -40,6 +152,7 @@ class DBConnectionMock(_Reverter):
         self._cursor = Cursor()
         self._flags = {'connected': True,
                        'committed': False}
+        self.rollbackCalls = 0
 
     @property
     def isConnected(self):
@@ -56,7 +169,10 @@ class DBConnectionMock(_Reverter):
         self._flags['committed'] = True
 
     def rollback(self):
-        pass
+        self.rollbackCalls += 1
+
+    def get_transaction_status(self):
+        return 0
 
     def close(self):
         self._flags['connected'] = False
@@ -67,19 +183,30 @@ class Cursor(_Reverter):
     def __init__(self):
         self._executedFlag = False
         self._queryResponses = {}
+        self._queryDescriptions = {}
         self._lastExecutedCommand = None
+        self._position = 0
+        self.executedCommands = []
+        self.lastParameters = None
 
     def setQueryResponses(self, queryResponses):
         self._queryResponses = {key.upper(): value for key, value in
                                 queryResponses.iteritems()}
 
+    def setQueryDescriptions(self, queryDescriptions):
+        self._queryDescriptions = {key.upper(): value for key, value in
+                                   queryDescriptions.iteritems()}
+
     @property
     def wasExecuted(self):
         return self._returnAndRevertIf(self._executedFlag, True)
 
-    def execute(self, sqlStatement):
+    def execute(self, sqlStatement, parameters=None):
         self._executedFlag = True
         self._lastExecutedCommand = sqlStatement.upper()
+        self.executedCommands.append(sqlStatement)
+        self.lastParameters = parameters
+        self._position = 0
 
     def fetchall(self):
         if self._lastExecutedCommand in self._queryResponses.keys():
@@ -87,8 +214,23 @@ class Cursor(_Reverter):
 
         return []
 
+    def fetchmany(self, size):
+        rows = self.fetchall()[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def close(self):
+        pass
+
     @property
     def description(self):
+        if self._lastExecutedCommand in self._queryDescriptions.keys():
+            return self._queryDescriptions[self._lastExecutedCommand]
+
         raise NotImplementedError
 
     @property
@@ -12,12 +12,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import gzip
 import sys
+from decimal import Decimal
+from tempfile import NamedTemporaryFile
 from os.path import join, dirname
 from unittest import TestCase, main
-from dbmock import DBDriverMock
+from dbmock import DBDriverMock, SqliteDriverMock, PostgresDriverMock
 sys.path.append(join(dirname(dirname(__file__)), 'src'))
 from Pydblibrary import Pydblibrary
+from Pydblibrary.dialects import get_dialect
+from Pydblibrary.keywords import _execution as executionModule
+from Pydblibrary.keywords._execution import _split_statements
+from Pydblibrary.keywords._table import _checksum_value
+from Pydblibrary import statistics as statisticsModule
 
 
 class PydblibraryTests(TestCase):
@@ -214,8 +222,8 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
-        responses = {'select * from employee': [(0, 'John', 'Doe'),
-                                                (1, 'Jane', 'Doe')]}
+        responses = {('SELECT COUNT(*) FROM (select * from employee) '
+                      'pydb_count'): [(2,)]}
 
         dbDriver.connection.cursor().setQueryResponses(responses)
 
@@ -230,6 +238,11 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
+        responses = {('SELECT COUNT(*) FROM (select * from employee) '
+                      'pydb_count'): [(0,)]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
         sut.rows_count_is_0('select * from employee')
 
     def testRowCountIsEqualToX(self):
@@ -240,8 +253,8 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
-        responses = {'select * from employee': [(0, 'John', 'Doe'),
-                                                (1, 'Jane', 'Doe')]}
+        responses = {('SELECT COUNT(*) FROM (select * from employee) '
+                      'pydb_count'): [(2,)]}
 
         dbDriver.connection.cursor().setQueryResponses(responses)
 
@@ -255,8 +268,8 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
-        responses = {'select * from employee': [(0, 'John', 'Doe'),
-                                                (1, 'Jane', 'Doe')]}
+        responses = {('SELECT COUNT(*) FROM (select * from employee) '
+                      'pydb_count'): [(2,)]}
 
         dbDriver.connection.cursor().setQueryResponses(responses)
 
@@ -270,13 +283,39 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
-        responses = {'select * from employee': [(0, 'John', 'Doe'),
-                                                (1, 'Jane', 'Doe')]}
+        responses = {('SELECT COUNT(*) FROM (select * from employee) '
+                      'pydb_count'): [(2,)]}
 
         dbDriver.connection.cursor().setQueryResponses(responses)
 
         sut.row_count_is_less_than_x('select * from employee', 3)
 
+    def testRowsAreCountedFromCursorIfWrappedStatementFails(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut._connectionCache.current.dialect = get_dialect('MySQLdb')
+        cursor = dbDriver.connection.cursor()
+        cursor.setQueryResponses({'select * from a join b':
+                                  [(1, 1), (2, 2)]})
+        execute = cursor.execute
+
+        def failingWrapped(sqlStatement, parameters=None):
+            execute(sqlStatement, parameters)
+            if 'pydb_' in sqlStatement:
+                raise Exception('Duplicate column name')
+
+        cursor.execute = failingWrapped
+
+        self.assertEqual(sut.rows_count('select * from a join b'), 2)
+        with self.assertRaises(AssertionError) as context:
+            sut.rows_count_is_0('select * from a join b')
+        self.assertIn('but got 2 rows', str(context.exception))
+        sut.check_if_exists_in_database('select * from a join b')
+
     def testCheckContentForRowIdentifiedByRownum(self):
         dbDriver = DBDriverMock()
 
@@ -318,9 +357,8 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
-        responses = {"select * from employee where surname='Doe'":
-                     [(0, 'John', 'Doe'),
-                      (1, 'Jane', 'Doe')]}
+        responses = {("SELECT COUNT(*) FROM (select * from employee "
+                      "where surname='Doe') pydb_count"): [(2,)]}
 
         dbDriver.connection.cursor().setQueryResponses(responses)
 
@@ -345,14 +383,43 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
-        responses = {("SELECT * FROM information_schema.tables WHERE "
-                      "table_name='employee'"):
-                     [('someDbName', 'public', 'employee', 'BASE TABLE',
-                       None, None, None, None, None, 'YES', 'NO', None)]}
+        responses = {"SELECT table_name FROM information_schema.tables":
+                     [('employee',), ('department',)]}
 
         dbDriver.connection.cursor().setQueryResponses(responses)
 
         sut.table_must_exist('employee')
+        sut.table_must_exist('department')
+
+        self.assertEqual(len(dbDriver.connection.cursor().executedCommands),
+                         1)
+
+        with self.assertRaises(AssertionError):
+            sut.table_must_exist('project')
+        sut.invalidate_metadata_cache()
+        with self.assertRaises(AssertionError):
+            sut.table_must_exist('project')
+
+        # Cached names are reloaded on miss, just loaded names are not.
+        self.assertEqual(len(dbDriver.connection.cursor().executedCommands),
+                         3)
+
+    def testMetadataCacheIsClearedOnDdl(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database(SqliteDriverMock(), 'someDbName',
+                                'someUsername', 'somePassword', 'someHost',
+                                '7777')
+        sut._connectionCache.current.dialect = get_dialect('sqlite3')
+        sut.execute_sql('create table employee (id integer)')
+
+        self.assertEqual(sut._table_columns('employee'), ['id'])
+
+        sut.execute_sql('alter table employee add column name text')
+
+        self.assertEqual(sut._table_columns('employee'), ['id', 'name'])
+        with self.assertRaises(AssertionError):
+            sut.table_must_exist('department')
 
     def testTableMustBeEmpty(self):
         dbDriver = DBDriverMock()
@@ -362,6 +429,11 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
+        responses = {"SELECT COUNT(*) FROM (SELECT * FROM employee) "
+                     "pydb_count": [(0,)]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
         sut.table_must_be_empty('employee')
 
     def testTableMustContainLessThanNumberOfRows(self):
@@ -372,8 +444,8 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
-        responses = {"select * from employee": [(0, 'John', 'Doe'),
-                                                (1, 'Jane', 'Doe')]}
+        responses = {"SELECT COUNT(*) FROM (SELECT * FROM employee) "
+                     "pydb_count": [(2,)]}
 
         dbDriver.connection.cursor().setQueryResponses(responses)
 
@@ -387,8 +459,8 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
-        responses = {"select * from employee": [(0, 'John', 'Doe'),
-                                                (1, 'Jane', 'Doe')]}
+        responses = {"SELECT COUNT(*) FROM (SELECT * FROM employee) "
+                     "pydb_count": [(2,)]}
 
         dbDriver.connection.cursor().setQueryResponses(responses)
 
@@ -402,12 +474,1113 @@ class PydblibraryTests(TestCase):
         sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
                                 'somePassword', 'someHost', '7777')
 
-        responses = {"select * from employee": [(0, 'John', 'Doe'),
+        responses = {"SELECT COUNT(*) FROM (SELECT * FROM employee) "
+                     "pydb_count": [(2,)]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        sut.table_must_contain_number_of_rows('employee', 2)
+
+    def testRowsCountForNotWrappableStatement(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        responses = {'show tables': [('employee',), ('department',)]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        self.assertTrue(sut.rows_count('show tables') == 2,
+                        'Incorrect rows count.')
+
+    def testTableMustContainMoreThanNumberOfRowsWithLimit(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut._connectionCache.current.dialect = get_dialect('sqlite3')
+
+        responses = {("SELECT COUNT(*) FROM (SELECT 1 FROM (SELECT * FROM "
+                      "employee) pydb_rows LIMIT 2) pydb_count"): [(2,)]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        sut.table_must_contain_more_than_number_of_rows('employee', '1')
+
+    def testCheckIfExistsInDatabaseWithLimit(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut._connectionCache.current.dialect = get_dialect('sqlite3')
+
+        responses = {('SELECT * FROM (select * from employee) pydb_probe '
+                      'LIMIT 1'): [(0, 'John', 'Doe')]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        sut.check_if_exists_in_database('select * from employee')
+
+    def testRowShouldNotExistInTableShowsSampleOfRows(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        responses = {"select * from employee where surname='Doe'":
+                     [(i, 'John', 'Doe') for i in range(100)]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        with self.assertRaises(AssertionError) as context:
+            sut.row_should_not_exist_in_table('employee', "surname='Doe'")
+
+        self.assertIn('at least 10', str(context.exception))
+        self.assertNotIn('(10, ', str(context.exception))
+
+    def testPooledConnectionIsReused(self):
+        dbDriver = DBDriverMock()
+        sut = Pydblibrary(connectionPooling='True')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut.disconnect_from_database()
+
+        self.assertTrue(dbDriver.connection.isConnected,
+                        'Pooled connection was closed on disconnect.')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        self.assertEqual(dbDriver.connectCalls, 1,
+                         'Pooled connection was not reused.')
+
+    def testDrainConnectionPool(self):
+        dbDriver = DBDriverMock()
+        sut = Pydblibrary(connectionPooling='True')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut.disconnect_from_database()
+        sut.drain_connection_pool()
+
+        self.assertFalse(dbDriver.connection.isConnected,
+                         'Connected to database but should be disconnected.')
+
+    def testConnectionIsClosedWhenPoolIsFull(self):
+        firstDriver = DBDriverMock()
+        secondDriver = DBDriverMock()
+        sut = Pydblibrary(connectionPooling='True', poolMaxSize='1')
+
+        sut.connect_to_database(firstDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut.connect_to_database(secondDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut.disconnect_from_all_databases()
+
+        self.assertTrue(firstDriver.connection.isConnected,
+                        'Pooled connection was closed on disconnect.')
+        self.assertFalse(secondDriver.connection.isConnected,
+                         'Connection was kept in the full pool.')
+
+        sut.ROBOT_LIBRARY_LISTENER[0].close()
+
+        self.assertFalse(firstDriver.connection.isConnected,
+                         'Pooled connection was not closed with library.')
+
+    def testExpiredPooledConnectionIsClosed(self):
+        dbDriver = DBDriverMock()
+        sut = Pydblibrary(connectionPooling='True', poolMaxIdleTime='-1')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut.disconnect_from_database()
+
+        self.assertFalse(dbDriver.connection.isConnected,
+                         'Expired connection was kept in the pool.')
+
+    def testEveryQueriedRowShouldSatisfy(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary(batchSize='1')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        responses = {'select * from employee': [(0, 'John', 'Doe'),
                                                 (1, 'Jane', 'Doe')]}
 
         dbDriver.connection.cursor().setQueryResponses(responses)
 
+        sut.every_queried_row_should_satisfy('select * from employee',
+                                             "row[2] == 'Doe'")
+
+        with self.assertRaises(AssertionError) as context:
+            sut.every_queried_row_should_satisfy('select * from employee',
+                                                 "row[1] == 'John'")
+
+        self.assertIn('1 of 2 rows', str(context.exception))
+
+    def testExecuteSqlDoesNotRollBackAfterCommit(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        sut.execute_sql('delete from employee')
+
+        self.assertEqual(dbDriver.connection.rollbackCalls, 0,
+                         'Committed statement was rolled back.')
+
+        sut.query('select * from employee')
+
+        self.assertEqual(dbDriver.connection.rollbackCalls, 1,
+                         'Query transaction was not rolled back.')
+
+    def testReadSingleValueFromTableWithParameters(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        responses = {"select name from employee where surname=%s":
+                     [('John',)]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        result = sut.read_single_value_from_table('employee', 'name',
+                                                  'surname=%s', ['Doe'])
+
+        self.assertEqual(result, ('John',))
+        self.assertEqual(dbDriver.connection.cursor().lastParameters,
+                         ('Doe',))
+
+    def testParameterizedStatementIsPreparedOnce(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary(statementCacheSize='1')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut._connectionCache.current.dialect = get_dialect('psycopg2')
+
+        sut.query('select * from employee where id=%s', [1])
+        sut.query('select * from employee where id=%s', [2])
+        sut.query('select * from employee where name=%s', ['John'])
+
+        commands = dbDriver.connection.cursor().executedCommands
+        self.assertEqual([c.split()[0] for c in commands],
+                         ['PREPARE', 'EXECUTE', 'EXECUTE', 'PREPARE',
+                          'DEALLOCATE', 'EXECUTE'])
+        self.assertTrue(commands[0].endswith(
+            'AS select * from employee where id=$1'))
+
+    def testStatementThatCouldNotBePreparedIsExecutedAsIs(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary(statementCacheSize='10')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut._connectionCache.current.dialect = get_dialect('psycopg2')
+        cursor = dbDriver.connection.cursor()
+        execute = cursor.execute
+
+        def failingPrepare(sqlStatement, parameters=None):
+            execute(sqlStatement, parameters)
+            if sqlStatement.startswith('PREPARE'):
+                raise Exception('could not determine data type')
+
+        cursor.execute = failingPrepare
+
+        sut.execute_sql('update employee set name=%s where %s is null',
+                        ['John', None])
+        sut.execute_sql('update employee set name=%s where %s is null',
+                        ['Jane', None])
+
+        self.assertEqual([c.split()[0] for c in cursor.executedCommands],
+                         ['PREPARE', 'update', 'update'])
+        self.assertEqual(cursor.lastParameters, ('Jane', None))
+        self.assertEqual(dbDriver.connection.rollbackCalls, 1)
+
+    def testDbElementsAreEqualOnSeveralDatabases(self):
+        dbDrivers = [DBDriverMock() for i in range(3)]
+
+        sut = Pydblibrary()
+
+        for i, dbDriver in enumerate(dbDrivers):
+            sut.connect_to_database(dbDriver, 'someDbName%s' % i,
+                                    'someUsername', 'somePassword',
+                                    'someHost', '7777', 'db%s' % i)
+
+        responses = {'select * from employee': [(0, 'John', 'Doe'),
+                                                (1, 'Jane', 'Doe')]}
+        dbDrivers[0].connection.cursor().setQueryResponses(responses)
+        dbDrivers[1].connection.cursor().setQueryResponses(responses)
+
+        with self.assertRaises(AssertionError) as context:
+            sut.db_elements_are_equal('select * from employee', 'db0', 'db1',
+                                      'db2')
+
+        self.assertIn('on db0 and db2', str(context.exception))
+        self.assertTrue(id(sut._connectionCache.current.connection) ==
+                        id(dbDrivers[2].connection),
+                        'Current database was changed.')
+
+    def testDbElementsAreEqualReportsDifference(self):
+        dbDriver1 = DBDriverMock()
+        dbDriver2 = DBDriverMock()
+
+        sut = Pydblibrary(batchSize='2')
+
+        sut.connect_to_database(dbDriver1, 'someDbName1', 'someUsername',
+                                'somePassword', 'someHost', '7777', 'db1')
+
+        sut.connect_to_database(dbDriver2, 'someDbName2', 'someUsername',
+                                'somePassword', 'someHost', '7777', 'db2')
+
+        responses1 = {'select * from employee': [(0, 'John', 'Doe'),
+                                                 (0, 'John', 'Doe'),
+                                                 (1, 'Jane', 'Doe'),
+                                                 (2, 'Max', 'Doe')]}
+        responses2 = {'select * from employee': [(0, 'John', 'Doe'),
+                                                 (1, 'Jane', 'Smith'),
+                                                 (2, 'Max', 'Doe'),
+                                                 (3, 'Ann', 'Doe')]}
+
+        dbDriver1.connection.cursor().setQueryResponses(responses1)
+        dbDriver2.connection.cursor().setQueryResponses(responses2)
+
+        with self.assertRaises(AssertionError) as context:
+            sut.db_elements_are_equal('select * from employee', 'db1', 'db2')
+
+        message = str(context.exception)
+        self.assertIn('1 row(s) are missing, 1 row(s) are extra and 1 row(s) '
+                      'are changed', message)
+        self.assertIn("Missing: (0, 'John', 'Doe')", message)
+        self.assertIn("Extra: (3, 'Ann', 'Doe')", message)
+        self.assertIn("Changed: (1, 'Jane', 'Doe') -> (1, 'Jane', 'Smith')",
+                      message)
+
+    def testTableChecksumsMustBeEqual(self):
+        sut = Pydblibrary()
+
+        for alias in ('db1', 'db2'):
+            sut.connect_to_database(SqliteDriverMock(), 'someDbName',
+                                    'someUsername', 'somePassword',
+                                    'someHost', '7777', alias)
+            sut._connectionCache.current.dialect = get_dialect('sqlite3')
+            sut.execute_sql('create table employee (id integer, '
+                            'part integer, name text, primary key (id, part))')
+            for i in range(10):
+                sut.execute_sql('insert into employee values (?, ?, ?)',
+                                [i // 3, i % 3, 'name%s' % i])
+
+        sut.table_checksums_must_be_equal('employee', 'db1', 'db2', 4,
+                                          'id, part')
+
+        sut.execute_sql("update employee set name='changed' where id=2 and "
+                        "part=0")
+
+        with self.assertRaises(AssertionError) as context:
+            sut.table_checksums_must_be_equal('employee', 'db1', 'db2', 4,
+                                              'id, part')
+
+        message = str(context.exception)
+        self.assertIn('differs in 1 of 3 chunk(s)', message)
+        self.assertIn("Changed: (2, 0, u'name6') -> (2, 0, u'changed')",
+                      message)
+
+    def testChecksumValueDoesNotDependOnDriverTypes(self):
+        self.assertEqual(_checksum_value(5L),
+                         _checksum_value(Decimal('5.00')))
+        self.assertEqual(_checksum_value(1.5),
+                         _checksum_value(Decimal('1.50')))
+        self.assertEqual(_checksum_value(u'name'), _checksum_value('name'))
+        self.assertNotEqual(_checksum_value(1.5), _checksum_value(15))
+
+    def testCheckContentForRowIdentifiedByRownumWithOffset(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut._connectionCache.current.dialect = get_dialect('sqlite3')
+
+        responses = {('select name,surname from employee order by id '
+                      'LIMIT 1 OFFSET 49999'): [('Jane', 'Doe')]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        sut.check_content_for_row_identified_by_rownum(
+            ['name', 'surname'], ['Jane', 'Doe'], 'employee', '50000', 'id')
+
+        with self.assertRaises(AssertionError):
+            sut.check_content_for_row_identified_by_rownum(
+                ['name', 'surname'], ['Jane', 'Doe'], 'employee', '0', 'id')
+
+    def testReadSingleValueFromTableShowsLimitedRows(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary(sampleRowsNumber='2')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        responses = {"select name from employee where surname='Doe'":
+                     [('John',), ('Jane',), ('Max',), ('Ann',)]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        with self.assertRaises(AssertionError) as context:
+            sut.read_single_value_from_table('employee', 'name',
+                                             "surname='Doe'")
+
+        self.assertIn("[('John',), ('Jane',)] and 2 more row(s)",
+                      str(context.exception))
+
+    def testDebugMessageIsNotFormattedIfNotLogged(self):
+        class NotFormattable(object):
+            def __str__(self):
+                raise AssertionError('Message was formatted.')
+
+        Pydblibrary()._debug('Got rows: %s', NotFormattable())
+
+    def testGetQueryStatistics(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary(queryStatistics='True')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777', 'db1')
+
+        responses = {'select * from employee': [(0, 'John', 'Doe'),
+                                                (1, 'Jane', 'Doe')]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        sut.query('select * from employee')
+        sut.query('select * from employee')
+        sut.execute_sql('delete from employee')
+
+        statistics = sut.get_query_statistics('1')
+
+        self.assertEqual(len(statistics), 1)
+        self.assertEqual(statistics[0]['statement'], 'select * from employee')
+        self.assertEqual(statistics[0]['alias'], 'db1')
+        self.assertEqual(statistics[0]['calls'], 2)
+        self.assertEqual(statistics[0]['rows'], 4)
+        self.assertEqual(statistics[0]['bytes'], 4 * (8 + 4 + 3))
+        self.assertEqual(len(sut.get_query_statistics()), 2)
+
+        sut.reset_query_statistics()
+
+        self.assertEqual(sut.get_query_statistics(), [])
+
+    def testQueryStatisticsAttributesFetchesToOwnExecution(self):
+        class CursorMock(object):
+            def fetchall(self):
+                clock.append(5)
+                return [('John',)]
+
+        clock = []
+        sut = statisticsModule.QueryStatistics()
+        originalTime = statisticsModule.time
+        statisticsModule.time = type('Clock', (object,),
+                                     {'time': staticmethod(clock.pop)})
+        try:
+            first = sut.timed_cursor(CursorMock(),
+                                     sut.add_execute('select 1', 'db1', 1))
+            second = sut.timed_cursor(CursorMock(),
+                                      sut.add_execute('select 2', 'db1', 2))
+            clock.append(0)
+            first.fetchall()
+            clock.append(0)
+            first.fetchall()
+            clock.append(0)
+            second.fetchall()
+        finally:
+            statisticsModule.time = originalTime
+
+        statistics = dict((s['statement'], s) for s in sut.top(2))
+
+        self.assertEqual(statistics['select 1']['total'], 11)
+        self.assertEqual(statistics['select 1']['rows'], 2)
+        self.assertEqual(statistics['select 2']['total'], 7)
+        self.assertEqual(statistics['select 2']['rows'], 1)
+
+    def testQueryStatisticsListenerWritesReportOnClose(self):
+        reportFile = NamedTemporaryFile()
+        sut = statisticsModule.QueryStatistics(reportFile.name)
+
+        sut.start_keyword('Query', {})
+        sut.add_execute('select * from employee', 'db1', 1.5)
+        sut.end_keyword('Query', {})
+        sut.add_execute('delete from employee', 'db1', 0.5)
+
+        self.assertEqual(open(reportFile.name).read(), '')
+
+        sut.close()
+
+        report = open(reportFile.name).read()
+        self.assertEqual(report, sut.report())
+        self.assertIn('2 statement(s), 2 call(s), 2.000 s.', report)
+        self.assertIn('keyword Query, alias db1: select * from employee',
+                      report)
+        self.assertIn('keyword None, alias db1: delete from employee',
+                      report)
+
+    def testBulkInsertRows(self):
+        sut = Pydblibrary(batchSize='1000')
+
+        sut.connect_to_database(SqliteDriverMock(), 'someDbName',
+                                'someUsername', 'somePassword', 'someHost',
+                                '7777')
+        sut._connectionCache.current.dialect = get_dialect('sqlite3')
+        sut.execute_sql('create table employee (id integer, name text)')
+
+        rowsNumber = sut.bulk_insert_rows(
+            'employee', [(i, 'name%s' % i) for i in range(2500)])
+
+        self.assertEqual(rowsNumber, 2500)
+        sut.table_must_contain_number_of_rows('employee', 2500)
+
+        csvFile = NamedTemporaryFile(suffix='.csv')
+        csvFile.write('name,id\nJohn,3000\n,3001\n')
+        csvFile.flush()
+
+        rowsNumber = sut.bulk_insert_rows('employee', csvFile.name)
+
+        self.assertEqual(rowsNumber, 2)
+        self.assertEqual(sut.query('select name from employee where id >= '
+                                   '3000 order by id'), [('John',), (None,)])
+
+    def testTransactionBlock(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database(SqliteDriverMock(), 'someDbName',
+                                'someUsername', 'somePassword', 'someHost',
+                                '7777')
+        sut._connectionCache.current.dialect = get_dialect('sqlite3')
+        sut.execute_sql('create table employee (id integer)')
+
+        sut.begin_transaction()
+        sut.execute_sql('insert into employee values (1)')
+        sut.execute_sql('insert into employee values (2)')
         sut.table_must_contain_number_of_rows('employee', 2)
+        sut.rollback_transaction()
+
+        sut.table_must_be_empty('employee')
+
+        sut.begin_transaction()
+        sut.bulk_insert_rows('employee', [(1,), (2,), (3,)], batchSize=2)
+        sut.commit_transaction()
+
+        with self.assertRaises(AssertionError):
+            sut.commit_transaction()
+
+        sut.table_must_contain_number_of_rows('employee', 3)
+
+    def testExecuteSqlScript(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database(SqliteDriverMock(), 'someDbName',
+                                'someUsername', 'somePassword', 'someHost',
+                                '7777')
+        sut._connectionCache.current.dialect = get_dialect('sqlite3')
+
+        script = NamedTemporaryFile(suffix='.sql')
+        script.write("-- schema; with semicolon\n"
+                     "create table employee (id integer, name text);\n"
+                     "/* fixtures;\n */\n"
+                     "insert into employee values (1, 'John; Doe');\n"
+                     "insert into employee values (2, 'it''s;\n');"
+                     "insert into employee values (3, \"name\")\n")
+        script.flush()
+
+        statementsNumber = sut.execute_sql_script(script.name, 2)
+
+        self.assertEqual(statementsNumber, 4)
+        self.assertEqual(sut.query('select name from employee order by id'),
+                         [('John; Doe',), ('it\'s;\n',), ('name',)])
+
+    def testSplitStatementsWithDollarQuoting(self):
+        lines = ["create function f() returns int as $body$\n",
+                 "begin return 1; end; $body$ language plpgsql;\n",
+                 "select $$;$$, $1 from t;  -- ;\n"]
+
+        self.assertEqual(list(_split_statements(lines)),
+                         ["create function f() returns int as $body$\n"
+                          "begin return 1; end; $body$ language plpgsql",
+                          "select $$;$$, $1 from t"])
+        self.assertEqual(list(_split_statements(["select 'a\\';b'; x"],
+                                                True)),
+                         ["select 'a\\';b'", "x"])
+
+    def testSplitStatementsWithEscapeStringsAndDollarIdentifiers(self):
+        lines = ["select E'a\\';b', e'\\\\'; ",
+                 "select 'c\\'; select a$b, $$;$$ from t$$;"]
+
+        self.assertEqual(list(_split_statements(lines)),
+                         ["select E'a\\';b', e'\\\\'",
+                          "select 'c\\'",
+                          "select a$b, $$;$$ from t$$"])
+
+    def testScriptWithTrailingLineCommentsIsExecutedAsOneBatch(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut._connectionCache.current.dialect = get_dialect('psycopg2')
+
+        sut._execute_batch(sut._connectionCache.current,
+                           ['delete from employee -- all', 'select 1'])
+
+        self.assertEqual(dbDriver.connection.cursor().executedCommands,
+                         ['delete from employee -- all\n;\nselect 1'])
+
+    def testLogLevelIsCheckedOncePerTest(self):
+        sut = Pydblibrary()
+        listener = sut.ROBOT_LIBRARY_LISTENER[0]
+
+        sut.connect_to_database(DBDriverMock(), 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut.execute_sql('delete from employee')
+        self.assertFalse(sut._debugLogged)
+
+        listener.start_test('Test', {})
+        self.assertIsNone(sut._debugLogged)
+
+    def testTestIsolationListenerRollsBackChanges(self):
+        sut = Pydblibrary(testIsolation='True')
+        listener = sut.ROBOT_LIBRARY_LISTENER[-1]
+
+        sut.connect_to_database(SqliteDriverMock(), 'someDbName',
+                                'someUsername', 'somePassword', 'someHost',
+                                '7777')
+        sut._connectionCache.current.dialect = get_dialect('sqlite3')
+        sut.execute_sql('create table employee (id integer)')
+
+        listener.start_test('Test', {})
+        sut.execute_sql('insert into employee values (1)')
+        sut.bulk_insert_rows('employee', [(2,), (3,)])
+        sut.table_must_contain_number_of_rows('employee', 3)
+        listener.end_test('Test', {})
+
+        sut.table_must_be_empty('employee')
+
+    def testTestIsolationListenerIsolatesConnectionOpenedInTest(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary(testIsolation='True')
+        listener = sut.ROBOT_LIBRARY_LISTENER[-1]
+
+        listener.start_test('Test', {})
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut.execute_sql('delete from employee')
+
+        self.assertFalse(dbDriver.connection.wasCommitted)
+
+        listener.end_test('Test', {})
+
+        self.assertEqual(dbDriver.connection.rollbackCalls, 1)
+
+        sut.execute_sql('delete from department')
+
+        self.assertTrue(dbDriver.connection.wasCommitted)
+
+    def testTransactionBlockInsideTestIsolationOnSqlite(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database('sqlite3', ':memory:')
+        sut.execute_sql('create table employee (id integer)')
+
+        sut.begin_test_isolation()
+        sut.execute_sql('insert into employee values (1)')
+        sut.begin_transaction()
+        sut.execute_sql('insert into employee values (2)')
+        sut.commit_transaction()
+        sut.execute_sql('create table department (id integer)')
+        sut.table_must_contain_number_of_rows('employee', 2)
+        sut.end_test_isolation()
+
+        sut.table_must_be_empty('employee')
+        sut.table_must_exist('employee')
+        with self.assertRaises(AssertionError):
+            sut.table_must_exist('department')
+
+        sut.begin_transaction()
+        sut.execute_sql('insert into employee values (3)')
+        sut.rollback_transaction()
+        sut.execute_sql('insert into employee values (4)')
+
+        self.assertEqual(sut.query('select id from employee'), [(4,)])
+
+    def testTransactionBlockInsideTestIsolationIsSavepoint(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        sut.begin_test_isolation()
+        sut.begin_transaction()
+        sut.execute_sql('delete from employee')
+        sut.rollback_transaction()
+        sut.execute_sql('delete from department')
+        sut.end_test_isolation()
+
+        self.assertEqual(dbDriver.connection.cursor().executedCommands,
+                         ['SAVEPOINT pydb_transaction',
+                          'delete from employee',
+                          'ROLLBACK TO SAVEPOINT pydb_transaction',
+                          'delete from department'])
+        self.assertFalse(dbDriver.connection.wasCommitted)
+        self.assertEqual(dbDriver.connection.rollbackCalls, 1)
+
+    def testDeleteAllRowsFromTablesInForeignKeyOrder(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database(SqliteDriverMock(), 'someDbName',
+                                'someUsername', 'somePassword', 'someHost',
+                                '7777')
+        sut._connectionCache.current.dialect = get_dialect('sqlite3')
+        sut.execute_sql('PRAGMA foreign_keys = ON')
+        sut.execute_sql('create table department (id integer primary key)')
+        sut.execute_sql('create table employee (id integer, department '
+                        'integer references department (id))')
+        sut.execute_sql('insert into department values (1)')
+        sut.execute_sql('insert into employee values (1, 1)')
+
+        sut.delete_all_rows_from_table('department, employee')
+
+        sut.table_must_be_empty('department')
+        sut.table_must_be_empty('employee')
+
+    def testDeleteAllRowsFromTablesWithTruncate(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary()
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        sut._connectionCache.current.dialect = get_dialect('psycopg2')
+
+        sut.delete_all_rows_from_table(['department', 'employee'], 'True',
+                                       'True', 'True')
+
+        self.assertEqual(dbDriver.connection.cursor().executedCommands,
+                         ['TRUNCATE department, employee RESTART IDENTITY '
+                          'CASCADE'])
+        self.assertTrue(dbDriver.connection.wasCommitted)
+
+    def testMetadataCacheIsClearedByRollbackAndDdl(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database(DBDriverMock(), 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+        metadata = sut._connectionCache.current.metadata
+
+        sut.begin_transaction()
+        metadata[('tables',)] = set(['employee'])
+        sut.rollback_transaction()
+        self.assertEqual(metadata, {})
+
+        metadata[('tables',)] = set(['employee'])
+        sut.execute_sql('-- drops table\n/* old */ DROP TABLE employee')
+        self.assertEqual(metadata, {})
+
+    def testDeleteAllRowsFromTablesFallsBackToDelete(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database('sqlite3', ':memory:')
+        sut.execute_sql('create table employee (id integer)')
+        sut.execute_sql('insert into employee values (1)')
+        # SQLite has no TRUNCATE statement, so it fails.
+        dialect = type('TruncatingDialect', (type(get_dialect('sqlite3')),),
+                       {'truncate': lambda self, tableNames, restartIdentity,
+                        cascade: ['TRUNCATE %s' % ', '.join(tableNames)]})
+        sut._connectionCache.current.dialect = dialect()
+
+        sut.delete_all_rows_from_table('employee')
+        sut.execute_sql('insert into employee values (2)')
+        sut.delete_all_rows_from_table('employee', useTruncate=True)
+
+        sut.table_must_be_empty('employee')
+
+    def testQueryResultIsCachedUntilWrite(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary(queryCacheSize='100')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        responses = {'select * from employee': [(0, 'John', 'Doe')]}
+
+        dbDriver.connection.cursor().setQueryResponses(responses)
+
+        sut.query('select * from employee')
+        result = sut.query('  select *\n  from employee;')
+        sut.execute_sql('delete from employee')
+        sut.query('select * from employee')
+
+        self.assertEqual(result, [(0, 'John', 'Doe')])
+        self.assertEqual(dbDriver.connection.cursor().executedCommands,
+                         ['select * from employee', 'delete from employee',
+                          'select * from employee'])
+        self.assertEqual(sut.get_query_cache_statistics(),
+                         {'hits': 1, 'misses': 2, 'entries': 1, 'rows': 1})
+
+    def testQueryCacheIsInvalidatedByWithStatementAndClose(self):
+        dbDriver = DBDriverMock()
+
+        sut = Pydblibrary(queryCacheSize='100')
+
+        sut.connect_to_database(dbDriver, 'someDbName', 'someUsername',
+                                'somePassword', 'someHost', '7777')
+
+        sut.query('select * from employee')
+        sut.execute_sql('with d as (delete from employee) select 1')
+        sut.query('select * from employee')
+
+        self.assertEqual(sut.get_query_cache_statistics(),
+                         {'hits': 0, 'misses': 2, 'entries': 1, 'rows': 0})
+
+        sut.query('with d as (delete from employee) select 1')
+        sut.query('with d as (delete from employee) select 1')
+
+        self.assertEqual(sut.get_query_cache_statistics(),
+                         {'hits': 0, 'misses': 2, 'entries': 0, 'rows': 0})
+
+        sut.disconnect_from_all_databases()
+
+        self.assertEqual(sut._queryCache.statistics()['entries'], 0)
+
+    def testSqlite3DriverDialect(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database('sqlite3', ':memory:')
+        sut.execute_sql('create table employee (name text, id integer, '
+                        'part integer, primary key (id, part))')
+        sut.bulk_insert_rows('employee', [('John', 1, 1), ('Jane', 1, 2)])
+
+        sut.table_must_exist('employee')
+        sut.check_primary_key_columns_for_table('employee', 'id, part')
+        self.assertEqual(sut.get_primary_key_columns_for_table('employee'),
+                         ['id', 'part'])
+        sut.transaction_isolation_level_must_be('TRANSACTION_SERIALIZABLE')
+        sut.row_count_is_greater_than_x('select * from employee', 1)
+        sut.check_content_for_row_identified_by_rownum(
+            ['name'], [u'Jane'], 'employee', 2, 'part')
+
+    def testQueryInBatchesWithQueriesOnTheSameConnection(self):
+        class BuiltInMock(object):
+            def run_keyword(self, name, rows):
+                counts.append((rows, sut.rows_count('select * from employee')))
+
+        counts = []
+        sut = Pydblibrary(batchSize='1')
+
+        sut.connect_to_database(PostgresDriverMock(), 'someDbName',
+                                'someUsername', 'somePassword', 'someHost',
+                                '7777')
+        sut._connectionCache.current.dialect = get_dialect('psycopg2')
+        sut.execute_sql('create table employee (id integer)')
+        sut.execute_sql('insert into employee values (1), (2)')
+
+        originalBuiltIn = executionModule.BuiltIn
+        executionModule.BuiltIn = BuiltInMock
+        try:
+            rowsNumber = sut.query_in_batches('select id from employee',
+                                              'Check Employees')
+        finally:
+            executionModule.BuiltIn = originalBuiltIn
+
+        self.assertEqual(rowsNumber, 2)
+        self.assertEqual(counts, [([(1,)], 2), ([(2,)], 2)])
+        self.assertFalse(
+            sut._connectionCache.current.connection.inTransaction)
+
+    def testStreamingCursorsOfPostgresHaveUniqueNames(self):
+        class ConnectionMock(object):
+            def cursor(self, name, withhold=False):
+                return name, withhold
+
+        dialect = get_dialect('psycopg2')
+        first = dialect.streaming_cursor(ConnectionMock())
+        second = dialect.streaming_cursor(ConnectionMock())
+
+        self.assertNotEqual(first[0], second[0])
+        self.assertTrue(first[1])
+
+    def testConnectionParamsOfDialects(self):
+        self.assertEqual(get_dialect('MySQLdb').connection_params(
+            'db', 'user', 'secret', 'host', '3306'),
+            {'db': 'db', 'user': 'user', 'passwd': 'secret', 'host': 'host',
+             'port': 3306})
+        self.assertEqual(get_dialect('cx_Oracle').connection_params(
+            'db', 'user', 'secret', 'host', '1521'),
+            {'user': 'user', 'password': 'secret', 'dsn': 'host:1521/db'})
+        self.assertEqual(
+            get_dialect('cx_Oracle').limit('SELECT 1 FROM t', 1, 5),
+            'SELECT 1 FROM t OFFSET 5 ROWS FETCH NEXT 1 ROWS ONLY')
+
+    def testChunkConditionNumbersOraclePlaceholders(self):
+        where, parameters = Pydblibrary._chunk_condition(
+            ['a', 'b'], ((1, 2), (3, 4)), get_dialect('cx_Oracle'))
+
+        self.assertEqual(where, ' WHERE ((a > :1) OR (a = :2 AND b >= :3)) '
+                                'AND ((a < :4) OR (a = :5 AND b < :6))')
+        self.assertEqual(parameters, [1, 1, 2, 3, 3, 4])
+        self.assertEqual(get_dialect('cx_Oracle').placeholders(3),
+                         ':1, :2, :3')
+        self.assertEqual(Pydblibrary._chunk_condition(
+            ['a'], (None, (5,)), get_dialect('sqlite3')),
+            (' WHERE ((a < ?))', [5]))
+
+    def testRunKeywordsConcurrently(self):
+        dbFile = NamedTemporaryFile(suffix='.db')
+        sut = Pydblibrary(concurrentConnections='2')
+
+        sut.connect_to_database('sqlite3', dbFile.name)
+        sut.execute_sql('create table employee (id integer, name text)')
+        sut.bulk_insert_rows('employee', [(1, 'John'), (2, 'Jane')])
+
+        results = sut.run_queries_concurrently(
+            'select name from employee where id=1',
+            'select name from employee where id=2',
+            'select count(*) from employee')
+
+        self.assertEqual(results, [[('John',)], [('Jane',)], [(2,)]])
+        self.assertEqual(len(sut._connectionCache.current.workers), 1)
+
+        with self.assertRaises(AssertionError) as context:
+            sut.run_keywords_concurrently(
+                'Check If Exists In Database',
+                "select * from employee where name='John'", 'AND',
+                'Row Count Is Equal To X', 'select * from employee', '3',
+                'AND', 'Pydblibrary.Table Must Exist', 'employee', 'AND',
+                'Table Must Exist', 'department')
+
+        message = str(context.exception)
+        self.assertIn('2 of 4 failed', message)
+        self.assertIn('2. Row Count Is Equal To X failed with '
+                      'AssertionError: Expected to have 3 rows', message)
+        self.assertIn('4. Table Must Exist failed with AssertionError: '
+                      'Table department does not exist.', message)
+
+        sut.execute_sql('drop table employee')
+        with self.assertRaises(AssertionError):
+            sut.run_keywords_concurrently('Table Must Exist', 'employee',
+                                          'AND', 'Table Must Exist',
+                                          'employee')
+
+        sut.execute_sql('create table project (id integer)')
+        sut.begin_test_isolation()
+        sut.run_keywords_concurrently(
+            'Execute Sql', 'insert into project values (1)', 'AND',
+            'Execute Sql', 'insert into project values (2)')
+        sut.end_test_isolation()
+        sut.table_must_be_empty('project')
+        self.assertIs(sut._connectionCache.current.workers[0].metadata,
+                      sut._connectionCache.current.metadata)
+
+    def testVerifyRowCountsWithOneQuery(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database('sqlite3', ':memory:')
+        sut.execute_sql('create table employee (id integer, name text)')
+        sut.bulk_insert_rows('employee', [(1, 'John'), (2, 'Jane'),
+                                          (3, 'John')])
+
+        sut.verify_row_counts(['employee', "name='John'", '2'],
+                              ['employee', '', '>0'],
+                              ['employee', "name='Max'", 0])
+
+        with self.assertRaises(AssertionError) as context:
+            sut.verify_row_counts([['employee', '', '<= 1'],
+                                   ['employee', "name='Jane'", '1'],
+                                   ['employee', 'id > 1', '!=2']])
+
+        self.assertEqual(str(context.exception),
+                         "Expected to get <= 1 row(s) from table employee for "
+                         "where-clause '', but got at least 2.\n"
+                         "Expected to get != 2 row(s) from table employee for "
+                         "where-clause 'id > 1', but got 2.")
+
+        with self.assertRaises(AssertionError) as context:
+            sut.verify_row_counts()
+
+        self.assertEqual(str(context.exception),
+                         "At least one check should be specified.")
+
+        with self.assertRaises(AssertionError) as context:
+            sut.verify_row_counts(['employee', '2'])
+
+        self.assertEqual(str(context.exception),
+                         "Check ['employee', '2'] should consist of table "
+                         "name, where-clause and expected number of rows.")
+
+    def testQueryColumns(self):
+        sut = Pydblibrary(batchSize='2')
+
+        sut.connect_to_database('sqlite3', ':memory:')
+        sut.execute_sql('create table employee (id integer, salary real, '
+                        'name text, bonus integer)')
+        sut.bulk_insert_rows('employee', [(1, None, 'John', None),
+                                          (2, 1000.5, 'Jane', 7),
+                                          (3, 2000.0, None, 'n/a'),
+                                          (4, 1000.5, 'Jane', 5)])
+
+        result = sut.query_columns('select * from employee')
+
+        self.assertEqual(len(result), 4)
+        self.assertEqual(result.sum('id'), 10)
+        self.assertEqual(result.sum('SALARY'), 4001.0)
+        self.assertEqual((result.min(1), result.max(1)), (1000.5, 2000.0))
+        self.assertEqual(result.null_count('salary'), 1)
+        self.assertEqual(result.distinct_count('name'), 2)
+        self.assertTrue(result.contains('name', None))
+        self.assertFalse(result.contains('id', 5))
+        self.assertEqual(result.values_not_in('name', ['John']), [u'Jane'])
+        self.assertEqual(result.values('bonus'), [None, 7, u'n/a', 5])
+        self.assertEqual(result.max('3'), u'n/a')
+        self.assertTrue(result._column('id').typed)
+        self.assertIsNone(sut.query_columns(
+            'select * from employee where id > 4').max('id'))
+
+    def testQueryColumnsWithServerSideCursor(self):
+        sut = Pydblibrary(batchSize='1')
+
+        sut.connect_to_database(PostgresDriverMock(), 'someDbName',
+                                'someUsername', 'somePassword', 'someHost',
+                                '7777')
+        sut._connectionCache.current.dialect = get_dialect('psycopg2')
+        sut.execute_sql('create table employee (id integer)')
+        sut.execute_sql('insert into employee values (1), (2)')
+
+        result = sut.query_columns('select id from employee')
+
+        self.assertEqual(result.values('id'), [1, 2])
+
+    def testCursorIsClosedWhenResultIsConsumed(self):
+        sut = Pydblibrary()
+
+        sut.connect_to_database('sqlite3', ':memory:')
+        sut.execute_sql('create table employee (id integer)')
+        sut.execute_sql('insert into employee values (1)')
+        current = sut._connectionCache.current
+
+        self.assertEqual(sut.query('select * from employee'), [(1,)])
+        self.assertIsNone(current._cursor)
+        self.assertEqual(sut.rows_count('select * from employee'), 1)
+        self.assertIsNone(current._cursor)
+        sut.check_if_exists_in_database('select * from employee')
+        self.assertIsNone(current._cursor)
+
+    def testQueryNamedRows(self):
+        sut = Pydblibrary(queryCacheSize='10')
+
+        sut.connect_to_database('sqlite3', ':memory:')
+        sut.execute_sql('create table employee (id integer, name text)')
+        sut.bulk_insert_rows('employee', [(1, 'John'), (2, 'Jane')])
+
+        self.assertEqual(sut.query('select * from employee'),
+                         [(1, 'John'), (2, 'Jane')])
+        result = sut.query('select * from employee', namedRows='True')
+
+        self.assertEqual(result, [(1, 'John'), (2, 'Jane')])
+        self.assertEqual((result[1].name, result[1]['ID']), ('Jane', 2))
+        self.assertEqual(result[0]._asdict(), {'id': 1, 'name': 'John'})
+        self.assertIs(type(result[0]), type(result[1]))
+        self.assertFalse(hasattr(result[0], '__dict__'))
+        with self.assertRaises(AttributeError):
+            result[0].age
+
+        row = sut.read_single_value_from_table('employee', 'name', 'id=1',
+                                               namedRows=True)
+        self.assertEqual(row.name, 'John')
+
+        row = sut.query('select count(*) as count from employee',
+                        namedRows=True)[0]
+        self.assertEqual(row['count'], 2)
+        self.assertEqual(row.count(2), 1)
+
+    def testExportQueryToFile(self):
+        sut = Pydblibrary(batchSize='1')
+
+        sut.connect_to_database('sqlite3', ':memory:')
+        sut.execute_sql('create table employee (id integer, name text)')
+        sut.bulk_insert_rows('employee', [(1, u'J\xfcrgen'), (2, None)])
+
+        csvFile = NamedTemporaryFile(suffix='.csv')
+        self.assertEqual(sut.export_query_to_file('select * from employee',
+                                                  csvFile.name),
+                         [2, 24])
+        self.assertEqual(csvFile.read(),
+                         'id,name\r\n1,J\xc3\xbcrgen\r\n2,\r\n')
+
+        tsvFile = NamedTemporaryFile(suffix='.tsv.gz')
+        rowsNumber, bytesNumber = sut.export_query_to_file(
+            'select * from employee where id > 1', tsvFile.name)
+        self.assertEqual(rowsNumber, 1)
+        self.assertEqual(gzip.open(tsvFile.name).read(),
+                         'id\tname\r\n2\t\r\n')
+
+        csvFile = NamedTemporaryFile(suffix='.csv')
+        sut.export_query_to_file('select * from employee where id > ?',
+                                 csvFile.name, nullValue='NULL',
+                                 parameters=[1])
+        self.assertEqual(csvFile.read(), 'id,name\r\n2,NULL\r\n')
+
+        with self.assertRaises(AssertionError):
+            sut.export_query_to_file('select * from employee', 'dump.xml')
+
+    def testExportQueryToFileWithServerSideCursor(self):
+        sut = Pydblibrary(batchSize='1')
+
+        sut.connect_to_database(PostgresDriverMock(), 'someDbName',
+                                'someUsername', 'somePassword', 'someHost',
+                                '7777')
+        sut._connectionCache.current.dialect = get_dialect('psycopg2')
+        connection = sut._connectionCache.current.connection
+        sut.execute_sql('create table employee (id integer, name text)')
+        sut.execute_sql("insert into employee values (1, 'John')")
+
+        csvFile = NamedTemporaryFile(suffix='.csv')
+        sut.export_query_to_file('select * from employee', csvFile.name)
+        self.assertEqual(csvFile.read(), 'id,name\r\n1,John\r\n')
+
+        with self.assertRaises(IOError):
+            sut.export_query_to_file('select * from employee',
+                                     join(csvFile.name, 'dump.csv'))
+        self.assertEqual(connection.openCursors, 0)
+        self.assertFalse(connection.inTransaction)
+
+        if executionModule.pyarrow is None:
+            with self.assertRaises(AssertionError):
+                sut.export_query_to_file('select * from employee',
+                                         'dump.parquet')
+            self.assertEqual(connection.openCursors, 0)
 
 if __name__ == '__main__':
     main()